@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Startup benchmark for emo_to_txt: each measurement runs in a fresh Python process, so it
+includes everything a short-lived CLI or request handler pays before its first translation.
+    1.  An importtime report (from python -X importtime) of the slowest imports.
+    2.  Cold-start times for import, EmoToTxt(), and the first emojize_sentence.
+Run from any directory:  python bench_startup.py [-top N] [-runs N] [-sentence TEXT]
+'''
+
+import argparse
+import json
+import os
+import os.path
+import subprocess
+import sys
+
+EMO_DIR = os.path.dirname(os.path.abspath(__file__))
+TXT_DIR = os.path.join(os.path.dirname(EMO_DIR), 'txt')
+
+COLD_START_CODE = '''
+import json, time
+beg = time.perf_counter()
+import emo_to_txt
+imp = time.perf_counter()
+emotrans = emo_to_txt.EmoToTxt()
+emotrans.options.split_join = %r
+emotrans.waflags = emotrans.options.waflags = 0
+ini = time.perf_counter()
+emotrans.emojize_sentence(%r)
+end = time.perf_counter()
+print(json.dumps({'import': imp - beg, 'init': ini - imp, 'first_sentence': end - ini, 'total': end - beg}))
+'''
+
+def run_python(args):
+    '''run python with args in EMO_DIR, with EMO_DIR and TXT_DIR on the path; exits on failure'''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [EMO_DIR, TXT_DIR, env.get('PYTHONPATH')]))
+    proc = subprocess.run([sys.executable] + args, cwd=EMO_DIR, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode:
+        sys.exit("bench_startup: python %s failed:\n%s" % (args[0], proc.stderr))
+    return proc
+
+def importtime_report(module='emo_to_txt', top=15):
+    '''
+    Returns a list of (cumulative_usec, self_usec, name) for the top slowest imports (by
+    cumulative time) when module is imported in a fresh process.
+    '''
+    stats = []
+    for line in run_python(['-X', 'importtime', '-c', 'import ' + module]).stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumul_us, name = line[len('import time:'):].split('|')
+        stats.append((int(cumul_us), int(self_us), name.rstrip()))
+    return sorted(stats, reverse=True)[:top]
+
+def cold_start_times(sentence, split_join=False):
+    '''dict of seconds for import, init, first_sentence, and total in a fresh process'''
+    return json.loads(run_python(['-c', COLD_START_CODE % (split_join, sentence)]).stdout.splitlines()[-1])
+
+def main():
+    '''show importtime report and cold-start times'''
+    parser = argparse.ArgumentParser(description="emo_to_txt startup benchmark")
+    parser.add_argument('-module', type=str, default='emo_to_txt', help='module to import (default: %(default)s)')
+    parser.add_argument('-runs', type=int, default=3, help='number of cold starts to time (default: %(default)s)')
+    parser.add_argument('-sentence', type=str, default='Rocks and paper can tip the boat.',
+                        help='sentence to translate')
+    parser.add_argument('-split_join', '-sj', action='store_true',
+                        help='translate by split and join, which does no POS tagging')
+    parser.add_argument('-top', type=int, default=15, help='number of imports to show (default: %(default)s)')
+    args = parser.parse_args()
+
+    print("importtime: %s  (slowest %d by cumulative time)" % (args.module, args.top))
+    print("%12s  %12s  %s" % ('cumul [us]', 'self [us]', 'module'))
+    for cumul_us, self_us, name in importtime_report(args.module, args.top):
+        print("%12d  %12d  %s" % (cumul_us, self_us, name))
+    print()
+    print("cold start: %s" % args.sentence)
+    print("%8s  %8s  %8s  %8s  %8s" % ('run', 'import', 'init', 'first', 'total'))
+    for run in range(1, args.runs + 1):
+        times = cold_start_times(args.sentence, args.split_join)
+        print("%8d  %8.3f  %8.3f  %8.3f  %8.3f" % (run, times['import'], times['init'],
+                                                   times['first_sentence'], times['total']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+cmu_table.py - The CMU Pronouncing Dictionary with each pronunciation already syllabified
+by word_phonetics.phone_seq_1, packed into one binary file that is memory-mapped on load:
+    header      magic, word count, pronunciation count
+    uint32s     offsets of the sorted words in the words blob (count + 1)
+    uint32s     index of the first pronunciation of each word (count + 1)
+    uint32s     offsets of the pronunciation records in the records blob (count + 1)
+    uint8s      syllable count of each pronunciation (padded to 4 bytes)
+    bytes       words blob (UTF-8), then records blob (UTF-8 "phones\\tphonetics\\tsyllables")
+Opening the file takes no parsing, and a lookup is a binary search plus one slice per
+pronunciation, memoized for repeated words.  The offset arrays are in native byte order,
+so build the file on the machine that uses it:
+
+    python cmu_table.py -build [table_file]
+'''
+
+import argparse
+import bisect
+import functools
+import mmap
+import os.path
+import struct
+import time
+from array import array
+import word_phonetics
+from word_phonetics import PhoneTuple
+
+CMU_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cmu_table.bin')
+CMU_TABLE_MAGIC = b'CMUSYL01'
+HEADER = struct.Struct('<8sII')
+
+def _uint32s(buf, beg, count):
+    '''memoryview of count uint32s in buf starting at byte beg, and the byte offset after them'''
+    end = beg + 4 * count
+    return buf[beg:end].cast('I'), end
+
+class _SortedWords:
+    '''Read-only sequence of the sorted words (as bytes) in the table, for bisect.'''
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return bytes(self.blob[self.offsets[idx]:self.offsets[idx + 1]])
+
+class CmuTable:
+    '''
+    Memory-mapped syllabified CMU Pronouncing Dictionary.  Behaves like the dict from
+    nltk.corpus.cmudict.dict() for reading (table[word], table.get(word), word in table),
+    and also gives each word's phonetic strings, PhoneTuples, and syllable count directly.
+    Words should be lowercased, as in cmudict.
+    '''
+
+    def __init__(self, path=CMU_TABLE_PATH, memo_size=1 << 16):
+        with open(path, 'rb') as table_file:
+            self._mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, nwords, nprons = HEADER.unpack_from(buf, 0)
+        if magic != CMU_TABLE_MAGIC:
+            raise ValueError("%s is not a CMU table file" % path)
+        word_offsets, pos = _uint32s(buf, HEADER.size, nwords + 1)
+        self.pron_starts, pos = _uint32s(buf, pos, nwords + 1)
+        self.rec_offsets, pos = _uint32s(buf, pos, nprons + 1)
+        self.counts = buf[pos:pos + nprons]
+        pos += (nprons + 3) // 4 * 4
+        self._words = _SortedWords(buf[pos:pos + word_offsets[nwords]], word_offsets)
+        self.records = buf[pos + word_offsets[nwords]:]
+        self.index = functools.lru_cache(maxsize=memo_size)(self._index)
+        self.entries = functools.lru_cache(maxsize=memo_size)(self._entries)
+
+    def _index(self, word):
+        '''index of word in the table, or -1'''
+        key = word.encode('utf-8')
+        idx = bisect.bisect_left(self._words, key)
+        return idx if idx < len(self._words) and self._words[idx] == key else -1
+
+    def _entries(self, word):
+        '''tuple of (phones, PhoneTuple) for each pronunciation of word, or None'''
+        idx = self.index(word)
+        if idx < 0:
+            return None
+        entries = []
+        for rec in range(self.pron_starts[idx], self.pron_starts[idx + 1]):
+            text = bytes(self.records[self.rec_offsets[rec]:self.rec_offsets[rec + 1]]).decode('utf-8')
+            phones, phonetics, syllables = text.split('\t')
+            entries.append((phones.split(), PhoneTuple(len(phonetics), phonetics, self.counts[rec],
+                                                       syllables.split())))
+        return tuple(entries)
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __getitem__(self, word):
+        '''list of CMU pronunciations (lists of phones) of word, as in cmudict.dict()'''
+        entries = self.entries(word)
+        if entries is None:
+            raise KeyError(word)
+        return [list(phones) for phones, _ in entries]
+
+    def get(self, word, default=None):
+        '''self[word] or default'''
+        return self[word] if word in self else default
+
+    def keys(self):
+        '''iterate over all words in sorted order'''
+        for idx in range(len(self._words)):
+            yield self._words[idx].decode('utf-8')
+
+    def phone_tuples(self, word):
+        '''list of PhoneTuples of word (as from phone_seq_1), one per pronunciation; may be empty'''
+        entries = self.entries(word)
+        return [phone_tuple for _, phone_tuple in entries] if entries else []
+
+    def phonetics(self, word):
+        '''list of phonetic strings of word, one per pronunciation, as from cmu_phonetics'''
+        return [phone_tuple.phonetics for phone_tuple in self.phone_tuples(word)]
+
+    def syllable_count(self, word):
+        '''syllable count of the first pronunciation of word, or None if word is not found'''
+        idx = self.index(word)
+        return self.counts[self.pron_starts[idx]] if idx >= 0 else None
+
+def syllabify(pron):
+    '''(phonetics, syllable count, syllables) of a CMU pronunciation, by phone_seq_1'''
+    count = word_phonetics.syl_count_cmu(pron)
+    try:
+        phone_tuple = word_phonetics.phone_seq_1(pron)
+        return phone_tuple.phonetics, count, phone_tuple.syllables
+    except IndexError:      # phone_seq_1 fails on pronunciations without vowels
+        return word_phonetics.phon_from_pron(pron), count, []
+
+def build_table(path=CMU_TABLE_PATH, cmu_prons=None, verbose=True):
+    '''Syllabify every pronunciation in cmu_prons (default: NLTK's cmudict) and save the table.'''
+    if cmu_prons is None:
+        from nltk.corpus import cmudict
+        cmu_prons = cmudict.dict()
+    beg_time = time.time()
+    words = sorted(cmu_prons, key=lambda word: word.encode('utf-8'))
+    word_offsets, pron_starts, rec_offsets = array('I', [0]), array('I', [0]), array('I', [0])
+    counts = bytearray()
+    words_blob, records_blob = bytearray(), bytearray()
+    for word in words:
+        words_blob += word.encode('utf-8')
+        word_offsets.append(len(words_blob))
+        for pron in cmu_prons[word]:
+            phonetics, count, syllables = syllabify(pron)
+            records_blob += '\t'.join([' '.join(pron), phonetics, ' '.join(syllables)]).encode('utf-8')
+            rec_offsets.append(len(records_blob))
+            counts.append(min(count, 255))
+        pron_starts.append(len(counts))
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as table_file:
+        table_file.write(HEADER.pack(CMU_TABLE_MAGIC, len(words), len(counts)))
+        for arr in (word_offsets, pron_starts, rec_offsets):
+            table_file.write(arr.tobytes())
+        table_file.write(bytes(counts) + bytes(-len(counts) % 4))
+        table_file.write(bytes(words_blob))
+        table_file.write(bytes(records_blob))
+    os.replace(tmp_path, path)
+    if verbose:
+        print("build_table: %d words, %d pronunciations saved to %s in %.1f seconds"
+              % (len(words), len(counts), path, time.time() - beg_time))
+
+def main():
+    '''build the CMU table, or look up words in one already built'''
+    parser = argparse.ArgumentParser(description="syllabified CMU Pronouncing Dictionary table")
+    parser.add_argument('table_file', type=str, nargs='?', default=CMU_TABLE_PATH,
+                        help='table file (default: %(default)s)')
+    parser.add_argument('-build', action='store_true', help='build and save the table from NLTK cmudict')
+    parser.add_argument('-words', type=str, nargs='*', default=['tomato', 'potable', 'lengthwise', 'obama'],
+                        help='words to look up')
+    args = parser.parse_args()
+    if args.build:
+        build_table(args.table_file)
+    beg_time = time.time()
+    table = CmuTable(args.table_file)
+    print("Opened %d words in %.3f seconds" % (len(table), time.time() - beg_time))
+    for word in args.words:
+        print(word, table.syllable_count(word), table.phone_tuples(word))
+
+if __name__ == '__main__':
+    main()
@@ -57,8 +57,6 @@ import argparse
 # from collections import defaultdict
 from collections import namedtuple
 
-import emo_tuples as E_T
-
 INDEX_HEX_CHR_CODES  = 0
 INDEX_UNICHR_LENGTH  = 1
 INDEX_DISPLAY_ORDER  = 2
@@ -71,7 +69,13 @@ INDEX_SHORT_NAME     = 8
 INDEX_ALTERNATIVES   = 9  # not used much; may go away
 COUNTRY_FLAGS_RANGE  = range(2120, 2377)
 
-EMO_TUPLES = E_T.gen_emo_tuples()
+def get_emo_tuples():
+    '''
+    Returns the list of all emo tuples, generated on the first call.  The emo_tuples module
+    is imported only then, so importing this module for its INDEX constants is cheap.
+    '''
+    import emo_tuples as E_T
+    return E_T.get_emo_tuples()
 
 NemoTuple = namedtuple('NemoTuple', 'code size ord categ flags chrs words short')
 
@@ -88,9 +92,10 @@ def gen_named_emo_tuples(emotups):
 class EmoTuples:
     '''class to contain associations between emojis and English text'''
     def __init__(self):
-        self.emo_tuples = EMO_TUPLES
+        import emo_tuples as E_T
+        self.emo_tuples = get_emo_tuples()
         self.emo_header = E_T.EMO_HEADER
-        self.nemo_tuples = gen_named_emo_tuples(EMO_TUPLES)
+        self.nemo_tuples = gen_named_emo_tuples(self.emo_tuples)
 
     def print_emo_tuples(self, category):
         '''print all emo tuples'''
@@ -51,11 +51,15 @@ Plan for General sentence translation [square brackets for the still TBD parts]:
 '''
 
 import argparse
+import hashlib
+import itertools
 import json
+import os.path
 import pickle
 import random
 import re
 import struct
+import sys
 from collections import Counter
 from collections import defaultdict
 from functools import partial
@@ -63,12 +67,9 @@ import time
 import editdistance
 import word_phonetics
 
-import nltk
-from nltk.corpus import wordnet
-from nltk.corpus import cmudict
-
 import emo_named as ET
 import inflection
+from lru_cache import LruCache
 import text_fio
 import text_regex
 from emo_sents import SENTENCES
@@ -129,6 +130,28 @@ def unicode_chr_str(hex_unicode):
 
 EMO_SYNONYMS = {}
 
+# nltk takes a second or more to import, so it is imported only where first needed.
+WORDNET_POS = ['a', 'n', 'r', 'v']     # wordnet.ADJ, wordnet.NOUN, wordnet.ADV, wordnet.VERB
+
+def pos_tag(words):
+    '''nltk.pos_tag, importing nltk on first use'''
+    import nltk
+    return nltk.pos_tag(words)
+
+def pos_tag_sents(word_lists):
+    '''nltk.pos_tag_sents, which loads the tagger once for all the lists, not once per list'''
+    import nltk
+    return nltk.pos_tag_sents(word_lists)
+
+def batched(iterable, size):
+    '''Generate lists of up to size consecutive items from iterable.'''
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 def wordnet_syn_set(word, pos, lower_only=True):
     '''
     Returns a list of wordnet synonyms of word based on part of speech
@@ -141,6 +164,7 @@ def wordnet_syn_set(word, pos, lower_only=True):
     If lower_only is True, only lowercase synonyms are included.
     The list may contain duplicates, which are likely to be more common words.
     '''
+    from nltk.corpus import wordnet
     synonyms = []
     synsets = wordnet.synsets(word, pos)
     for synset in synsets:
@@ -218,6 +242,38 @@ def _add_txt_emo_multiples(preset_dict):
         'board'   : ['🎹 ➖ 🔑 ', '⌨ ➖ 🗝'],
     })
 
+PHRASE_END = None      # key under which a trie node holds the translations of the key ending there
+
+def gen_phrase_trie(txt_emo):
+    '''
+    Returns a token trie of the multi-word keys in txt_emo: nested dicts keyed by word,
+    where the node reached by all the words of a key holds its list of emojis under PHRASE_END.
+    '''
+    trie = {}
+    for txt, emo_lst in txt_emo.items():
+        words = txt.split(' ')
+        if len(words) > 1:
+            node = trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node[PHRASE_END] = emo_lst
+    return trie
+
+def gen_suffix_trie(emo_txt):
+    '''
+    Returns a character trie of the reversed keys of emo_txt: nested dicts keyed by char,
+    where the node reached by the last through first chars of a key holds its list of texts
+    under PHRASE_END, so walking backward from any position in a string finds all the keys
+    that end there.
+    '''
+    trie = {}
+    for emo, txt_lst in emo_txt.items():
+        node = trie
+        for uchr in reversed(emo):
+            node = node.setdefault(uchr, {})
+        node[PHRASE_END] = txt_lst
+    return trie
+
 def print_tagged(tagged):
     '''Pretty prints words and the POS-tags aligned on two lines.'''
     maxlen = [max(len(tag[0]), len(tag[1])) for tag in tagged]
@@ -255,6 +311,44 @@ SHOW_PHONETIC_TEXT = 2056
 SHOW_USABLE_EMOJIS = 4096
 SHOW_SYNONYM_LISTS = 8192
 SHOW_PHONETICS_KEX = 16384
+SHOW_POS_TAGGINGS = 32768
+
+# Translation tables built by EmoToTxt depend only on these options and on the source files
+# listed below, so they are saved in a pickle per option set and reused until a source changes.
+# Bump TABLES_VERSION when changing how the tables are built or what they contain.
+TABLES_VERSION = 1
+TABLES_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLES_SOURCES = ['emo_to_txt.py', 'emo_named.py', 'emo_tuples.py', 'word_phonetics.py']
+TABLES_OPTIONS = ['all_skin_tones', 'multiples', 'arithmetic', 'no_articles']
+
+def tables_path(options, tables_dir=TABLES_DIR):
+    '''path of the tables cache file for the table-building options in options'''
+    flags = ''.join('1' if getattr(options, opt, False) else '0' for opt in TABLES_OPTIONS)
+    return os.path.join(tables_dir, 'emo_tables_%s.pkl' % flags)
+
+def tables_fingerprint(tables_dir=TABLES_DIR):
+    '''hash of TABLES_VERSION and the contents of TABLES_SOURCES'''
+    hasher = hashlib.blake2b(str(TABLES_VERSION).encode('ascii'), digest_size=16)
+    for name in TABLES_SOURCES:
+        with open(os.path.join(tables_dir, name), 'rb') as src:
+            hasher.update(src.read())
+    return hasher.hexdigest()
+
+def load_tables(path, fingerprint):
+    '''Returns the dict of tables saved at path, or None if it is missing, unreadable, or stale.'''
+    try:
+        with open(path, 'rb') as pkl:
+            tables = pickle.load(pkl)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+    return tables if tables.get('fingerprint') == fingerprint else None
+
+def save_tables(path, tables):
+    '''Save tables to path, via a temporary file, so concurrent readers never see a partial file.'''
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as pkl:
+        pickle.dump(tables, pkl, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
 
 class EmoToTxt:
     '''
@@ -271,7 +365,53 @@ class EmoToTxt:
         # print("EmoToTxt: self.options: ", self.options)
         self.verbose = self.options.verbose
         self.waflags = self.options.waflags
-        self.cmu_pro = cmudict.dict() # get the CMU Pronouncing Dict # TODO: wrap in sep class
+        self._cmu_pro = None
+        self._phrase_trie = None
+        self._suffix_trie = None
+        cache_size = getattr(self.options, 'cache_size', 100000)
+        self.word_cache = LruCache(cache_size)     # (word, pos, space, options) -> word_candidates
+        self.span_cache = LruCache(cache_size)     # emo_span -> textize_emo_span result
+        self._init_tables()
+        self.singular_nouns = set(text_fio.read_text_lines('en_singular_nouns_different_from_plural.txt'))
+        self.plural_nouns = set(text_fio.read_text_lines('en_plural_nouns_different_from_singular.txt'))
+        # print("DBG self.plural_nouns:", self.plural_nouns)
+
+    @property
+    def cmu_pro(self):
+        '''the CMU Pronouncing Dict, loaded on first use'''
+        if self._cmu_pro is None:
+            self._cmu_pro = word_phonetics.cmu_pd()  # TODO: wrap in sep class
+        return self._cmu_pro
+
+    @property
+    def phrase_trie(self):
+        '''token trie of multi-word keys in txt_emo, generated on first use'''
+        if self._phrase_trie is None:
+            self._phrase_trie = gen_phrase_trie(self.txt_emo)
+        return self._phrase_trie
+
+    @property
+    def suffix_trie(self):
+        '''character trie of reversed keys in emo_txt, generated on first use'''
+        if self._suffix_trie is None:
+            self._suffix_trie = gen_suffix_trie(self.emo_txt)
+        return self._suffix_trie
+
+    def _init_tables(self):
+        '''
+        Load the translation tables from their cache file if it is current for these options,
+        else generate them (and save them, unless the option tables_cache is False).
+        Watching usable emojis always regenerates them, to show the output.
+        '''
+        use_cache = getattr(self.options, 'tables_cache', True) and not self.waflags & SHOW_USABLE_EMOJIS
+        if use_cache:
+            path = tables_path(self.options)
+            fingerprint = tables_fingerprint()
+            tables = load_tables(path, fingerprint)
+            if tables is not None:
+                self.__dict__.update(tables['tables'])
+                self.presets = self.txt_emo     # gen_txt_to_emo extends the presets in place
+                return
         self.usables = self._gen_usables()
         if self.waflags & SHOW_USABLE_EMOJIS:
             self.print_usable_emojis()
@@ -280,9 +420,14 @@ class EmoToTxt:
         self.emo_txt = self.gen_emo_to_txt(self.presets)
         self.pro_emo = self._gen_pros_to_emos(self.txt_emo)
         self.emo_chr_counts = self.count_emo_chrs()
-        self.singular_nouns = set(text_fio.read_text_lines('en_singular_nouns_different_from_plural.txt'))
-        self.plural_nouns = set(text_fio.read_text_lines('en_plural_nouns_different_from_singular.txt'))
-        # print("DBG self.plural_nouns:", self.plural_nouns)
+        if use_cache:
+            tables = {name: getattr(self, name) for name in
+                      ['usables', 'txt_emo', 'emo_txt', 'pro_emo', 'emo_chr_counts']}
+            try:
+                save_tables(path, {'fingerprint': fingerprint, 'tables': tables})
+            except OSError as ex:
+                if self.verbose > 1:
+                    print("EmoToTxt: could not save tables to %s: %s" % (path, ex))
 
     def _init_options(self, options):
         '''initialize missing options with default values'''
@@ -299,6 +444,7 @@ class EmoToTxt:
                 uh_for_article_a=False,
                 verbose=3,
                 waflags=4,
+                tables_cache=True,
                 tokenizer=TOKENIZER_WORD_EXTENDED,
             )
         return options
@@ -330,13 +476,13 @@ class EmoToTxt:
         #     print(tup)
         #     assert type(tup[i_short]) == str
         if self.options.all_skin_tones and self.options.multiples:
-            return [tup for tup in ET.EMO_TUPLES if tup[i_flags] > 0]
+            return [tup for tup in ET.get_emo_tuples() if tup[i_flags] > 0]
         if self.options.all_skin_tones:
-            return [tup for tup in ET.EMO_TUPLES if tup[i_flags] == 1]
+            return [tup for tup in ET.get_emo_tuples() if tup[i_flags] == 1]
         if self.options.multiples:
-            return [tup for tup in ET.EMO_TUPLES if tup[i_flags] > 0 and
+            return [tup for tup in ET.get_emo_tuples() if tup[i_flags] > 0 and
                     not RE_TONED_EMO_NAME.match(tup[i_short])]
-        return [tup for tup in ET.EMO_TUPLES if tup[i_flags] == 1 and
+        return [tup for tup in ET.get_emo_tuples() if tup[i_flags] == 1 and
                 not RE_TONED_EMO_NAME.match(tup[i_short])]
 
     def print_usable_emojis(self):
@@ -551,7 +697,7 @@ class EmoToTxt:
 
         synonyms = [word]
         is_lower = word.islower()
-        if pos in [wordnet.ADJ, wordnet.NOUN, wordnet.ADV, wordnet.VERB]:
+        if pos in WORDNET_POS:
             try:
                 synonyms.extend(wordnet_syn_set(word, pos, is_lower))
                 # print("XXX SYNONYMS(%s, %s):" % (word, pos), synonyms)
@@ -582,10 +728,26 @@ class EmoToTxt:
         '''
         Return a translation of src_word into a string of emoji characters,
         or, failing that, return the original src_word.
+        The work of finding a translation is cached per word, POS, space, and options,
+        as the candidate pieces from word_candidates, so that with options.random each
+        call still makes its own random picks.
         '''
         if src_word == 'a' and not self.options.uh_for_article_a:
             return 'a'
-
+        key = (src_word, pos, space, self.options.phonetics, self.options.singularize, self.options.pluralize)
+        pieces = self.word_cache.lookup(key)
+        if pieces is None:
+            pieces = self.word_cache.store(key, self.word_candidates(src_word, pos, space))
+        if self.options.random:
+            return ''.join((random.choice(choices) + suffix) * repeat for choices, suffix, repeat in pieces)
+        return ''.join((choices[0] + suffix) * repeat for choices, suffix, repeat in pieces)
+
+    def word_candidates(self, src_word, pos=None, space=' '):
+        '''
+        Find how to translate src_word, as for emojize_word, but return the translation
+        as a list of pieces (choices, suffix, repeat), each to be rendered as one of the
+        choices followed by suffix, all repeated repeat times.
+        '''
         synonyms = self.emo_synonyms(src_word, pos)
         # if len(synonyms) > 1:
         #     synset = set([syn.lower() for syn in synonyms])
@@ -595,40 +757,40 @@ class EmoToTxt:
             print("EW SYNONYMS: {} -:> {}".format(src_word, synonyms))
 
         for word in synonyms:
-            emojis = self.emojize_token(word)
-            if emojis:
-                return emojis + space
+            emo_lst = self.txt_emo.get(word)
+            if emo_lst:
+                if self.waflags & SHOW_TOKEN_REPLACE:
+                    print("ET: {} :-> {}".format(word, emo_lst))
+                return [(emo_lst, space, 1)]
 
             if word.isnumeric():
-                emojis = self.emojize_chars(word)
-                if emojis:
-                    return emojis + space
+                chr_lsts = [self.txt_emo.get(char) for char in word]
+                if all(chr_lsts):
+                    return [(lst, ' ', 1) for lst in chr_lsts[:-1]] + [(chr_lsts[-1], space, 1)]
 
             if self.options.phonetics:
                 phon_word = self.gen_phonetic_word(word)
                 if phon_word:
                     for phone_tuple in phon_word.phons():
-                        emojis = self.emojize_phone(phone_tuple.phonetics, space)
+                        emo_lst = self.pro_emo.get(phone_tuple.phonetics)
                         if self.waflags & SHOW_PHONETIC_TEXT:
-                            print("PHONETICS: {} --> {} ? ".format(phone_tuple.phonetics, emojis))
-                        if emojis:
+                            print("PHONETICS: {} --> {} ? ".format(phone_tuple.phonetics, emo_lst))
+                        if emo_lst:
                             if self.waflags & SHOW_TOKEN_REPLACE:
-                                print("EW  PHONE: {} -> {} -:> {}".format(word, phone_tuple.phonetics, emojis))
-                            return emojis # space already appended
+                                print("EW  PHONE: {} -> {} -:> {}".format(word, phone_tuple.phonetics, emo_lst))
+                            return [(emo_lst, space, 1)]
                         if len(phone_tuple.syllables) > 1:
-                            emo_lst = []
-                            for syllable in phone_tuple.syllables:
-                                emojis = self.emojize_phone(syllable, space)
-                                if not emojis:
-                                    break
-                                emo_lst.append(emojis)
-                            else:
-                                return ''.join(emo_lst) # space already appended
+                            syl_lsts = [self.pro_emo.get(syllable) for syllable in phone_tuple.syllables]
+                            if all(syl_lsts):
+                                return [(lst, space, 1) for lst in syl_lsts]
 
             if self.options.singularize and self.is_plural_noun(word):
-                emostr = self.emojize_plural_noun(word, space)
-                if emostr:
-                    return emostr
+                singular = singularize(word)
+                emo_lst = self.txt_emo.get(singular) if singular != word else None
+                if emo_lst:
+                    if self.waflags & SHOW_NOUN_SINGPLUR:
+                        print("EW PLURAL: {} --> {} x 2".format(word, emo_lst))
+                    return [(emo_lst, space, 2)]    # reduplicated
 
                 # At least when subtraction is allowed, lip == lips - S ~= <kiss> - S == 💋 - S == 💋 <-> <S>
                 # NB: Not elif, because some nouns can be either singular and plural, e.g. fish, sheep, dice,
@@ -637,17 +799,18 @@ class EmoToTxt:
                 if self.is_singular_noun(word):
                     plural = pluralize(word)
                     if plural != word:
-                        emojis = self.emojize_token(plural)
-                        if emojis:
-                            emostr = emojis + self.minus_s_emo()
+                        emo_lst = self.txt_emo.get(plural)
+                        if emo_lst:
                             if self.waflags & SHOW_NOUN_SINGPLUR:
-                                print("EW SINGLE: {} --> {}".format(word, emostr))
-                            return emostr
+                                print("EW SINGLE: {} --> {} - S".format(word, emo_lst))
+                            return [(emo_lst, self.minus_s_emo(), 1)]
 
         hyphenated = src_word.split('-')
         if len(hyphenated) > 1:
-            return ' ➖ '.join([self.emo_or_txt_token(token) for token in hyphenated])
-        return src_word
+            pieces = [(self.txt_emo.get(token) or [token], ' ➖ ', 1) for token in hyphenated]
+            pieces[-1] = (pieces[-1][0], '', 1)
+            return pieces
+        return [([src_word], '', 1)]
 
     def emojize_match(self, match_obj, space=' '):
         '''Translate word tokens from a regex match.'''
@@ -688,42 +851,31 @@ class EmoToTxt:
         tokens = text_regex.RE_NOT_NON_WORD_TOKEN.split(text)
         # strips = [tok.strip() for tok in tokens]
         twords = tokens[1::2]
-        tagged = nltk.pos_tag(twords)
-        print_tagged(tagged)
+        tagged = pos_tag(twords)
+        return self.emojize_tagged_tokens(tokens, tagged, space)
+
+    def emojize_tagged_tokens(self, tokens, tagged, space=' '):
+        '''
+        Translate the tokens of a sentence body, as split by RE_NOT_NON_WORD_TOKEN (so words
+        are at odd indexes), where tagged holds the (word, POS tag) pairs of the words.
+        '''
+        if self.waflags & SHOW_POS_TAGGINGS:
+            print_tagged(tagged)
         subbed = []
         idx, size = 0, len(tokens)
         while idx < size:
             if idx % 2:                     # odd-indexed tokens are wordy
                 wrd = tokens[idx]
-                if idx + 2 < size and tokens[idx + 1].isspace():
-                    bigram = wrd + ' ' + tokens[idx + 2]
-                    if self.waflags & SHOW_SPACE_BIGRAMS:
-                        print("BIGRAM: ", bigram)
-                    if idx + 4 < size and tokens[idx + 3].isspace():
-                        trigram = bigram + ' ' + tokens[idx + 4]
-                        if self.waflags & SHOW_TEXT_TRIGRAMS:
-                            print("TRIGRAM: ", trigram)
-                        lst = self.txt_emo.get(trigram)
-                        if not lst and not trigram.islower():
-                            lst = self.txt_emo.get(trigram.lower())
-                        if lst:
-                            emo = random.choice(lst) if self.options.random else lst[0]
-                            subbed.append(emo + space)
-                            if self.waflags & SHOW_TEXT_TRIGRAMS:
-                                print("TRIGRAM: APPENDED {}  FROM list( {} )".format(emo, lst))
-                            idx += 5
-                            continue
-                    lst = self.txt_emo.get(bigram)
-                    if not lst and not bigram.islower():
-                        lst = self.txt_emo.get(bigram.lower())
-                    if lst:
-                        emo = random.choice(lst) if self.options.random else lst[0]
-                        subbed.append(emo + space)
-                        if self.waflags & SHOW_SPACE_BIGRAMS:
-                            print("BIGRAM: APPENDED {}  FROM list( {} )".format(emo, lst))
-                        idx += 3
-                        continue
-                # If no bigram match was found, look for single-word match.
+                lst, span = self.match_phrase(tokens, idx)
+                if lst:
+                    emo = random.choice(lst) if self.options.random else lst[0]
+                    subbed.append(emo + space)
+                    if self.waflags & (SHOW_SPACE_BIGRAMS | SHOW_TEXT_TRIGRAMS):
+                        print("PHRASE: APPENDED {}  FROM list( {} )  FOR ({})".format(
+                            emo, lst, ''.join(tokens[idx:idx + span])))
+                    idx += span
+                    continue
+                # If no phrase match was found, look for single-word match.
                 pos = tagged[idx // 2][1][0].lower()
                 subbed.append(self.emojize_word(wrd, pos, space=' '))
             else:
@@ -732,6 +884,32 @@ class EmoToTxt:
         subs = ''.join(subbed)
         return subs
 
+    def match_phrase(self, tokens, idx):
+        '''
+        Find the longest multi-word key of txt_emo whose words are the word tokens starting
+        at tokens[idx], as split by RE_NOT_NON_WORD_TOKEN (so words are at every other index),
+        with only whitespace between them.  A phrase matches as is or all lowercased; for the
+        same length, as is comes first.  Walks the phrase trie, so the cost does not depend on
+        the size of txt_emo, and phrases can have any number of words.
+        Returns the pair (list of emojis, number of tokens spanned), or (None, 0).
+        '''
+        exact = lower = self.phrase_trie
+        best, span = None, 0
+        end, size = idx, len(tokens)
+        while True:
+            word = tokens[end]
+            exact = exact.get(word) if exact else None
+            lower = lower.get(word.lower()) if lower else None
+            if exact is None and lower is None:
+                break
+            if end > idx:
+                lst = (exact or {}).get(PHRASE_END) or (lower or {}).get(PHRASE_END)
+                if lst:
+                    best, span = lst, end - idx + 1
+            if end + 2 >= size or not tokens[end + 1].isspace():
+                break
+            end += 2
+        return best, span
 
     def emojize_text_subs(self, text, space=' '):
         '''
@@ -861,61 +1039,65 @@ class EmoToTxt:
         return [word]
 
 
+    def segment_emo_span(self, emo_span):
+        '''
+        Divide a string of emoji chars (an "emo_span") into the fewest whole keys of emo_txt,
+        by dynamic programming over the end positions of keys (as in Viterbi decoding):
+        for each end position, walking the suffix trie backward finds every key that ends
+        there, and the best division of the span up to that end extends the best division
+        up to the start of one of those keys.  Among divisions with equally few keys, the one
+        whose later keys are longer wins, since appended modifiers belong to the emoji before
+        them.  The time is linear in the length of the span (times the longest key length),
+        with no recursion.  Returns the list of keys in order, or None if there is no division.
+        '''
+        size = len(emo_span)
+        counts = [0] + [None] * size        # counts[end]: fewest keys making up emo_span[:end]
+        begs = [0] * (size + 1)             # begs[end]: start of the last of those keys
+        trie = self.suffix_trie
+        for end in range(1, size + 1):
+            node = trie
+            for beg in range(end - 1, -1, -1):
+                node = node.get(emo_span[beg])
+                if node is None:
+                    break
+                if PHRASE_END in node and counts[beg] is not None:
+                    if counts[end] is None or counts[beg] + 1 <= counts[end]:
+                        counts[end], begs[end] = counts[beg] + 1, beg
+        if counts[size] is None:
+            return None
+        keys, end = [], size
+        while end > 0:
+            keys.append(emo_span[begs[end]:end])
+            end = begs[end]
+        keys.reverse()
+        return keys
+
     def textize_emo_span_from_end(self, emo_span, prev_words=None):
         '''
         Try to translate a string of emoji chars into a string of English text
-        by recursively dividing the string of emoji chars (or "emo_span") into
-        a sequence of whole emojis, backing up greedily from the end, and
-        translating each one individually.  The string  (or "span") as a whole
-        should have already been tried as one key, and it  should not contain
-        any spaces.  Going backward from the end simplifies the parsing of
-        complex emojis, because appended modifiers can be passed over as found.
+        by dividing the string of emoji chars (or "emo_span") into a sequence of
+        whole emojis (see segment_emo_span), then translating each one, backing up
+        from the end.  The string (or "span") as a whole should have already been
+        tried as one key, and it should not contain any spaces.  Going backward from
+        the end simplifies the combining of complex emojis, because appended modifiers
+        can be passed over as found, and append_to_prev_list handles reduplication and
+        "minus S" on the words already translated.
         Still, some modifiers are whole emojis in their own right.
         This inherent ambiguity may lead to poor translations.
         Returns a single string containing one word or a phrase of words
         separated by single spaces.  If no emoji to text translation is found,
         the original span is returned as-is.
         '''
-        if  self.waflags & SHOW_TEXT_DIVISION:
-            print("TESFE A:  span({})  prev_words({})".format(emo_span, prev_words))
-        # emo_span = emo_span.rstrip() -- should no longer need (or want) to strip.
-
-        # If the this (whole or remaining) span can be parsed as a single emoji
-        # with an (English) translation, just return it, concatenated with any
-        # words already parsed.
-        try:
-            # if emo_span[-1] == space:
-            #     lst = self.emo_txt[emo_span[0:-1]]
-            # else:
-            #     lst = self.emo_txt[emo_span]
-            word_calcs = self.emo_txt[emo_span]
-            if self.waflags & SHOW_TEXT_DIVISION:
-                print("TESFE B: {} -:> {}".format(emo_span, word_calcs))
-            return self.append_to_prev_list(word_calcs, prev_words).reverse()
-        except KeyError:
-            # Else divide the string into two parts, and if the 2nd part is a word, keep going.
-            # Use min and max word lengths to skip checking substrings that cannot be words.
-            max_index = len(emo_span)
-            min_index = max_index - MAX_MULTI_EMO_LEN
-            if  min_index < 0:
-                min_index = 0
-            max_index -= MIN_SOLIT_EMO_LEN
-            while max_index >= min_index:
-                substr = emo_span[max_index:]
-                word_calcs = self.emo_txt.get(substr, [])
-                if self.waflags & SHOW_TEXT_DIVISION:
-                    print("while min({})  max({})  substr({})  calcs({})".format(
-                        min_index, max_index, substr, word_calcs))
-                if len(word_calcs) > 0:
-                    txt = self.append_to_prev_list(word_calcs, prev_words)
-                    if self.waflags & SHOW_TEXT_DIVISION:
-                        print("TESFE D: Calling textize_emo_span_from_end({}, {})".format(
-                            emo_span[0:max_index], txt))
-                    more_words = self.textize_emo_span_from_end(emo_span[0:max_index], txt)
-                    if more_words:
-                        return more_words
-                max_index -= 1
-        return emo_span          # string did not parse
+        keys = self.segment_emo_span(emo_span)
+        if self.waflags & SHOW_TEXT_DIVISION:
+            print("TESFE:  span({})  keys({})  prev_words({})".format(emo_span, keys, prev_words))
+        if not keys:
+            return emo_span          # string did not parse
+        words = list(prev_words) if prev_words else None
+        for key in reversed(keys):
+            words = self.append_to_prev_list(self.emo_txt[key], words)
+        words.reverse()
+        return ' '.join(words)
 
 
     def _textize_emo_list(self, emo_list, space=' '):
@@ -977,7 +1159,7 @@ class EmoToTxt:
                     print("TEL emo_txt: {} -:> {} --> ({})".format(emo_str, word_calcs, calc))
                 txt_list.append(calc)
             except KeyError:
-                # Else divide the string recursively into parts, and try to tranlate each part.
+                # Else divide the string into parts, and try to tranlate each part.
                 if self.waflags & SHOW_TEXT_DIVISION:
                     print("TEL : Calling TESFE(%s)" % emo_str)
                 calc = self.textize_emo_span_from_end(emo_str)
@@ -994,6 +1176,15 @@ class EmoToTxt:
             emo_list = emo_span.split()         # NB: call plain split(), not split(space)
             return self._textize_emo_list(emo_list)
 
+    def textize_emo_span_cached(self, emo_span):
+        '''textize_emo_span, with results kept in self.span_cache unless translations are random'''
+        if self.options.random:
+            return self.textize_emo_span(emo_span)
+        txt_list = self.span_cache.lookup(emo_span)
+        if txt_list is None:
+            txt_list = self.span_cache.store(emo_span, self.textize_emo_span(emo_span))
+        return txt_list
+
     def textize_sentence_subs(self, emo_sent, space=' '):
         '''
         return text with each emoji replaced by a value from emo_txt.
@@ -1010,7 +1201,7 @@ class EmoToTxt:
                 emo_span += uchr
                 emo_prev = None
             elif emo_span:
-                txt_list = self.textize_emo_span(emo_span)
+                txt_list = self.textize_emo_span_cached(emo_span)
                 if txt_list:
                     if self.waflags & SHOW_EMO_LIST_VALS:
                         print("TSS list: {}".format(txt_list))
@@ -1035,7 +1226,7 @@ class EmoToTxt:
                 txt_sent += uchr
                 first = False
         if emo_span:
-            txt_list = self.textize_emo_span(emo_span)
+            txt_list = self.textize_emo_span_cached(emo_span)
             if txt_list:
                 txt_join = space.join(txt_list)
                 if self.waflags & SHOW_EMO_LIST_VALS:
@@ -1068,6 +1259,39 @@ class EmoToTxt:
         '''translate emoji sentence to text according to options'''
         return self.textize_sentence_subs(sentence)
 
+    def emojize_stream(self, sentences, batch_size=256, space=' '):
+        '''
+        Generate the emoji translations of an iterable of text sentences, as emojize_sentence
+        would translate them (but see textize_stream about the caches), POS-tagging each batch
+        of batch_size sentences in one call.  With options.split_join, nothing is tagged.
+        '''
+        if self.options.split_join:
+            for sentence in sentences:
+                yield self.emojize_sentence_beg_mid_end(sentence, self.emojize_text_split_join, space)
+            return
+        for batch in batched(sentences, batch_size):
+            parts = [text_regex.sentence_beg_body_and_end(sentence) for sentence in batch]
+            token_lists = [text_regex.RE_NOT_NON_WORD_TOKEN.split(body) for _, body, _ in parts]
+            tagged_lists = pos_tag_sents([tokens[1::2] for tokens in token_lists])
+            for (beg, _, end), tokens, tagged in zip(parts, token_lists, tagged_lists):
+                subs = self.emojize_tagged_tokens(tokens, tagged, space)
+                tend = self.emojize_token(end)
+                yield ''.join([beg, subs, space + tend if tend else end])
+
+    def textize_stream(self, sentences):
+        '''
+        Generate the text translations of an iterable of emoji sentences.  Translations of
+        words and emoji spans are reused from bounded LRU caches (in emojize_sentence and
+        textize_sentence too), except when options.random is set.
+        '''
+        for sentence in sentences:
+            yield self.textize_sentence(sentence)
+
+    def print_cache_stats(self):
+        '''Show hit and miss counts of the word and span caches.'''
+        print("EmoToTxt word_cache: %s" % self.word_cache.stats_str())
+        print("EmoToTxt span_cache: %s" % self.span_cache.stats_str())
+
     def trans_txt_to_emo_and_back(self, sentence):
         '''translate text sentence to emoji and back, showing stages according to options'''
         if self.options.waflags & SHOW_SOURCE_TEXT:
@@ -1104,6 +1328,7 @@ def shuffled_list(seq):
 
 def test_translate_sentences(options):
     '''Test translation from Enlish to emojis and back.'''
+    import nltk
     emotrans = EmoToTxt(options)
     txt_emo = emotrans.txt_emo
     emo_txt = emotrans.emo_txt
@@ -1135,6 +1360,30 @@ def test_translate_sentences(options):
         for sentence in text_fio.read_text_lines(options.text_file, options.charset):
             emotrans.trans_txt_to_emo_and_back(sentence)
 
+def translate_file(emotrans, input_path, output_path, textize=False, charset='utf-8', batch_size=256):
+    '''
+    Translate each line of the input file (from text to emojis, or if textize, from emojis
+    to text) and write the translations line by line to the output file, where '-' means
+    stdin or stdout.  Shows the number of lines and the time taken on stderr.
+    '''
+    beg_time = time.time()
+    infile = sys.stdin if input_path == '-' else open(input_path, 'r', encoding=charset)
+    outfile = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+    count = 0
+    try:
+        lines = (line.rstrip('\n') for line in infile)
+        stream = emotrans.textize_stream(lines) if textize else emotrans.emojize_stream(lines, batch_size)
+        for count, translation in enumerate(stream, 1):
+            print(translation, file=outfile)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    seconds = time.time() - beg_time
+    print("translate_file: %d lines in %.2f seconds (%.1f lines/second)"
+          % (count, seconds, count / seconds if seconds else 0.0), file=sys.stderr)
+
 def main():
     '''test english -> emoji translation'''
     parser = argparse.ArgumentParser(
@@ -1148,6 +1397,10 @@ def main():
                         help='charset encoding of input text')
     parser.add_argument('-end', dest='print_end', type=str, nargs='?', const=' ', default='\n',
                         help='end= argument to give print')
+    parser.add_argument('-batch_size', type=int, default=256,
+                        help='number of sentences to POS-tag at once with -input (default: %(default)s)')
+    parser.add_argument('-cache_size', type=int, default=100000,
+                        help='maximum number of word and emoji span translations to cache')
     parser.add_argument('-extract_words', action='store_true',
                         help='extract words from emotuples')
     parser.add_argument('-enj', type=str, nargs='?', default=None,
@@ -1157,6 +1410,9 @@ def main():
                         help='show the emoji-to-text mapping')
     parser.add_argument('-flags', action='store_true',
                         help='use flag emojis in translations of words not representing countries')
+    parser.add_argument('-input', '--input', type=str, default=None,
+                        help='translate each line of this file ("-" for stdin) and write '
+                             'the translations to -output (quiet; ignores -verbose)')
     parser.add_argument('-jen', type=str, nargs='?', default=None,
                         const=DEFAULT_TRANSLAT,
                         help='input an emoji sentence to translate to English (or use default)')
@@ -1166,6 +1422,8 @@ def main():
                         help='remove articles (a, an, the)')
     parser.add_argument('-order', '-original', action='store_true',
                         help='Translate and show sentences in original order, not in random order')
+    parser.add_argument('-output', '--output', type=str, default='-',
+                        help='output file for -input translations (default: - <stdout>)')
     parser.add_argument('-phonetics', action='store_false',
                         help='Disable phonetic matching (which is on by default)')
     parser.add_argument('-pluralize', action='store_false',
@@ -1180,9 +1438,13 @@ def main():
     parser.add_argument('-split_join', '-sj', action='store_true',
                         help='translate using split and join (irreversible because destructive), '
                              'not substitution (conservative)')
+    parser.add_argument('-no_tables_cache', dest='tables_cache', action='store_false',
+                        help='always generate the translation tables; do not load or save their cache file')
     parser.add_argument('-text_file', dest='text_file', type=str, nargs='?',
                         const='quotations.txt', default=None,
                         help='translate sentences from this text_file')
+    parser.add_argument('-textize', action='store_true',
+                        help='with -input, translate emojis to text instead of text to emojis')
     parser.add_argument('-tokenizer', type=int, nargs='?',
                         const=TOKENIZER_WORD_EXTENDED, default=TOKENIZER_NOT_NON_WORD,
                         help='specify tokenizer as: 1=NOT_NON_WORD, 2=WORD_EXTENDED')
@@ -1198,6 +1460,13 @@ def main():
                         help='watch flags for specific output (default: 1 [from verbose])')
     args = parser.parse_args()
 
+    if args.input:
+        args.verbose = args.waflags = 0
+        emotrans = EmoToTxt(args)
+        translate_file(emotrans, args.input, args.output, args.textize,
+                       'utf-8' if args.textize else args.charset, args.batch_size)
+        exit(0)
+
     verbose = args.verbose
     if verbose > 0:
         args.waflags |= (2**verbose - 1)
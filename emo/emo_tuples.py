@@ -2448,4 +2448,11 @@ def gen_emo_tuples(filters=None):
     ]
     return emo_tuples
 
-EMO_TUPLES = gen_emo_tuples()
+_EMO_TUPLES = None
+
+def get_emo_tuples():
+    '''Returns the list of all emo tuples, generated on the first call instead of on import.'''
+    global _EMO_TUPLES
+    if _EMO_TUPLES is None:
+        _EMO_TUPLES = gen_emo_tuples()
+    return _EMO_TUPLES
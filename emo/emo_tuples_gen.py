@@ -60,7 +60,7 @@ def regen_emo_tuples(name='EMO_TUPLES', start=None, stop=None, step=None):
     print(name, "= [")
     if stop == 0:
         stop = None
-    for j, t in enumerate(ET.EMO_TUPLES[start:stop:step], 1):
+    for j, t in enumerate(ET.get_emo_tuples()[start:stop:step], 1):
         polys = t[5]
         for text in t[8]:
             polys.append(text)
@@ -79,7 +79,7 @@ def regen_emo_tuples_old(name='EMO_TUPLES', start=None, stop=None, step=None):
     print(name, "= [")
     if stop == 0:
         stop = None
-    for t in ET.EMO_TUPLES[start:stop:step]:
+    for t in ET.get_emo_tuples()[start:stop:step]:
         monos, polys = [], []   # Changed from: set(), set()
         for word in t[5]:
             if sylc.syl_count(cmu_prons, word) == 1:
@@ -121,7 +121,7 @@ def reset_country_codes_to_emoflags(cc_path='country_codes.txt',
     cmu_prons = cmudict.dict() # get the CMU Pronouncing Dict
     cc_dict = load_country_codes(cc_path)
 
-    for tup in ET.EMO_TUPLES[irange.start:irange.stop]:
+    for tup in ET.get_emo_tuples()[irange.start:irange.stop]:
         cc2 = tup[ET.INDEX_ALTERNATIVES][0].strip(':').upper()
         # print(cc2, '  ', end='')
         monos, polys, names = [], [], [cc2]
@@ -149,7 +149,7 @@ def reflag_emo_tuples(start=None, stop=None, step=None):
     if stop == 0:
         stop = None
     print("reflagging ({}, {}, {})".format(start, stop, step))
-    for tup in ET.EMO_TUPLES[start:stop:step]:
+    for tup in ET.get_emo_tuples()[start:stop:step]:
         if not tup[ET.INDEX_WORDSYLLABLES]:
             lst = list(tup)
             lst[ET.INDEX_FLAGS] = 0
@@ -168,7 +168,7 @@ def emo_dict_col(emodict, key, column):
 
 def gen_emo_dict(name='EMO_DICT', start=None, stop=None, step=None):
     print(name, "= {")
-    for t in ET.EMO_TUPLES[start:stop:step]:
+    for t in ET.get_emo_tuples()[start:stop:step]:
         print("    '%s' : %s," % (t[0], t[1:4] + (et.unicode_chr_str(t[0]),) + t[5:]))
     print("}")
 
@@ -330,13 +330,13 @@ class EmoTrans:
         #     print(tup)
         #     assert type(tup[i_short]) == str
         if self.options.all_skin_tones and self.options.multiples:
-            return [tup for tup in ET.EMO_TUPLES if tup[i_flags] > 0]
+            return [tup for tup in ET.get_emo_tuples() if tup[i_flags] > 0]
         if self.options.all_skin_tones:
-            return [tup for tup in ET.EMO_TUPLES if tup[i_flags] == 1]
+            return [tup for tup in ET.get_emo_tuples() if tup[i_flags] == 1]
         if self.options.multiples:
-            return [tup for tup in ET.EMO_TUPLES if tup[i_flags] > 0 and
+            return [tup for tup in ET.get_emo_tuples() if tup[i_flags] > 0 and
                     not RE_TONED_EMO_NAME.match(tup[i_short])]
-        return [tup for tup in ET.EMO_TUPLES if tup[i_flags] == 1 and
+        return [tup for tup in ET.get_emo_tuples() if tup[i_flags] == 1 and
                 not RE_TONED_EMO_NAME.match(tup[i_short])]
 
     def print_usable_emojis(self):
@@ -12,14 +12,13 @@ Plan:
 '''
 
 import argparse
+import os.path
 import re
 import string
 # from collections import defaultdict
 from collections import namedtuple
-from nltk.corpus import cmudict
 from text_regex import words_split_out
 from text_regex import word_tokens
-import hyphenate
 
 def syl_count_cmu(pron):
     '''number of syllables in a CMU-style pronunciation'''
@@ -100,7 +99,11 @@ def syllable_count(cmu_prons, word):
     '''
     syllable count: from the first CMU pronunciation, if found,
     or a calculated one.  The word should already be lowercased.
+    cmu_prons may be the dict from cmudict or a cmu_table.CmuTable.
     '''
+    if hasattr(cmu_prons, 'syllable_count'):
+        count = cmu_prons.syllable_count(word)
+        return count if count is not None else count_vowel_groups(word)
     try:
         return syl_count_cmu_first(cmu_prons, word)
     except KeyError:
@@ -421,7 +424,10 @@ class PhoneticWord:
         self.word = word
         self.lwrd = word.lower()
         self.cmu_prons = cmu_prons_dict.get(self.lwrd, [])
-        self.phone_sex = [phone_seq_1(pron, verbose) for pron in self.cmu_prons]
+        if hasattr(cmu_prons_dict, 'phone_tuples') and not verbose:
+            self.phone_sex = cmu_prons_dict.phone_tuples(self.lwrd)     # already syllabified
+        else:
+            self.phone_sex = [phone_seq_1(pron, verbose) for pron in self.cmu_prons]
         if verbose:
             print("PhoneticWord.__init__: ", end='')
             if self.cmu_prons:
@@ -441,10 +447,18 @@ class PhoneticWord:
 CMU_PRON_DICT = None
 
 def cmu_pd():
-    '''Returns CMU Pronouncing Dictionary as a global.'''
+    '''
+    Returns CMU Pronouncing Dictionary as a global: the syllabified table built by
+    cmu_table.py, if there is one, else the dict from nltk's cmudict.
+    '''
     global CMU_PRON_DICT
     if CMU_PRON_DICT is None:
-        CMU_PRON_DICT = cmudict.dict()
+        import cmu_table
+        if os.path.exists(cmu_table.CMU_TABLE_PATH):
+            CMU_PRON_DICT = cmu_table.CmuTable()
+        else:
+            from nltk.corpus import cmudict     # importing nltk takes a second or more
+            CMU_PRON_DICT = cmudict.dict()
     return CMU_PRON_DICT
 
 def get_prons(word):
@@ -463,7 +477,10 @@ def get_pron(word):
 
 def get_phons(word, verbose=False):
     '''Returns phonetic spellings for word based on CMU Pronouncing Dictionary.'''
-    return cmu_phonetics(cmu_pd(), word, verbose)
+    cmu_prons = cmu_pd()
+    if hasattr(cmu_prons, 'phonetics') and not verbose:
+        return cmu_prons.phonetics(word)
+    return cmu_phonetics(cmu_prons, word, verbose)
 
 
 def main():
@@ -483,6 +500,7 @@ def main():
                         help='verbosity of output (default: 1)')
     args = parser.parse_args()
 
+    import hyphenate
     cmu_prons = cmu_pd() # get the CMU Pronouncing Dict
     hyphenator = hyphenate.get_default_hyphenator()
 
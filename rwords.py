@@ -23,6 +23,7 @@ import re
 import sys
 from collections import defaultdict
 from collections import Counter
+from subs.cipher_index import CorpusIndex
 
 class SubCipher:
     '''Solver to infer a simple substituion cipher based on a large
@@ -36,6 +37,7 @@ class SubCipher:
         self.corpus_len_1, self.corpus_words = word_counts_short_and_long(corpus_file, 1)
         self.cipher_chars = count_chars_from_words(self.cipher_words)
         self.corpus_chars = count_chars_from_words(self.corpus_words)
+        self.corpus_index = CorpusIndex(self.corpus_words)
         self.forward_map = defaultdict(int)
         self.inverse_map = defaultdict(int)
         self.inverse_score = 0
@@ -142,8 +144,6 @@ class SubCipher:
         match corpus words.  The highest score wins.  (That is, the
         decision is immediate, not defered to accumulate multiple
         scoring passes or backpropogating votes.'''
-        num_words = len(self.corpus_words)
-        corpus = self.corpus_words.most_common(num_words) # Just try them all
         inverse_pq = [] # priority = [num_unknown (updated on pop), -count, length]
         for ciph, count in self.cipher_words.items():
             entry = [self.number_of_unknowns(ciph), -count, len(ciph), ciph]
@@ -156,7 +156,7 @@ class SubCipher:
                 continue
             num_unk, idx_unk = self.num_idx_unknown(ciph)   # update (unknowns can become known)
             if num_unk == 1:
-                self.inverse_match_1_unknown(ciph, length, idx_unk, corpus)
+                self.inverse_match_1_unknown(ciph, idx_unk)
 
             elif num_unk > 1:
                 if ciph == sentinel:
@@ -174,10 +174,10 @@ class SubCipher:
                 print('\tAlready deciphered: ', num_unk, -neg_count, ciph
                       , self.decipher_word(ciph))
 
-    def inverse_match_1_unknown(self, ciph, length, idx_unknown, corpus):
+    def inverse_match_1_unknown(self, ciph, idx_unknown):
         '''Try to match one cipher word with a single unknown against all
-        corpus words of same length.  Accept the match that maximaly
-        improves the total score (if there is any such a match).'''
+        corpus words of same length, as looked up in the corpus index.  Accept
+        the match that maximaly improves the total score (if there is any such a match).'''
         if self.verbose > 3:
             print('Trying to match cipher word {} at index {}'.format(ciph, idx_unknown))
         self.inverse_score = self.score_inverse_map()
@@ -185,23 +185,15 @@ class SubCipher:
         max_score = 0
         max_word = ''
         deciphered = self.decipher_word(ciph)
-        for word, _ in corpus:
-            if len(word) == length:
-                # Match inverted ciphers to word chars
-                for idx in range(length):
-                    if idx == idx_unknown:
-                        continue            # skip over the single unknown
-                    if word[idx] != deciphered[idx]:
-                        break               # break on the first known mismatch
-                else:                       # all known chars matched, hole excluded
-                    # Compute the total score that would result from accepting this mapping
-                    word_char = word[idx_unknown]
-                    self.inverse_map[ciph_char] = word_char # create temporary inverse mapping
-                    try_score = self.score_inverse_map()    # compute score with this mapping
-                    self.inverse_map[ciph_char] = 0         # delete temporary inverse mapping
-                    if max_score < try_score:
-                        max_score = try_score
-                        max_word = word
+        for word in self.corpus_index.words_matching_1_unknown(deciphered):
+            # Compute the total score that would result from accepting this mapping
+            word_char = word[idx_unknown]
+            self.inverse_map[ciph_char] = word_char # create temporary inverse mapping
+            try_score = self.score_inverse_map()    # compute score with this mapping
+            self.inverse_map[ciph_char] = 0         # delete temporary inverse mapping
+            if max_score < try_score:
+                max_score = try_score
+                max_word = word
 
         if max_score > self.inverse_score:
             self.update_mapping_on_better_score(ciph, idx_unknown, max_word, max_score)
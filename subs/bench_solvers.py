@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''Benchmark for the substitution-cipher solvers and the corpus index they share:
+    1.  Corpus lookups of words with one unknown letter: CorpusIndex against a scan
+        of every corpus word of the same length (the solvers' old inner loop).
+    2.  Time to construct and solve with subs_cipher.SubCipher and rwords.SubCipher,
+        each in a fresh Python process.  Solving writes cipher_file.key and .decoded.
+Usage: python bench_solvers.py cipher_file corpus_file [-queries N] [-runs N]
+'''
+
+import argparse
+import json
+import os
+import os.path
+import subprocess
+import sys
+import time
+from cipher_index import CorpusIndex, UNKNOWN
+from subs_cipher import word_counts_short_and_long
+
+SUBS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SUBS_DIR)
+SOLVERS = ['subs_cipher', 'rwords']
+
+SOLVE_CODE = '''
+import json, time
+from %s import SubCipher
+beg = time.perf_counter()
+subs = SubCipher(%r, %r, 0)
+ini = time.perf_counter()
+subs.solve()
+end = time.perf_counter()
+print(json.dumps({'init': ini - beg, 'solve': end - ini, 'score': subs.score_inverse_map()}))
+'''
+
+def lookup_queries(corpus_words, num_words):
+    '''Returns each of the num_words most common corpus words with each letter in turn unknown.'''
+    return [word[:idx] + UNKNOWN + word[idx + 1:]
+            for word, _ in corpus_words.most_common(num_words) for idx in range(len(word))]
+
+def time_lookups(corpus_words, queries):
+    '''Returns seconds to build the index, do the queries with it the first time (which
+    also builds the wildcard entries for their lengths) and again, and do them by scanning.'''
+    beg = time.perf_counter()
+    index = CorpusIndex(corpus_words)
+    built = time.perf_counter()
+    found = [index.words_matching_1_unknown(query) for query in queries]
+    first = time.perf_counter()
+    found = [index.words_matching_1_unknown(query) for query in queries]
+    again = time.perf_counter()
+    scanned = [index.scan_1_unknown(query) for query in queries]
+    end = time.perf_counter()
+    if found != scanned:
+        sys.exit("bench_solvers: index and scan lookups differ")
+    return built - beg, first - built, again - first, end - again
+
+def time_solver(solver, cipher_file, corpus_file):
+    '''dict of seconds for init and solve, and the final score, from solver in a fresh process'''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SUBS_DIR, ROOT_DIR, env.get('PYTHONPATH')]))
+    code = SOLVE_CODE % (solver, os.path.abspath(cipher_file), os.path.abspath(corpus_file))
+    proc = subprocess.run([sys.executable, '-c', code], cwd=SUBS_DIR, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode:
+        sys.exit("bench_solvers: %s failed:\n%s" % (solver, proc.stderr))
+    return json.loads(proc.stdout.splitlines()[-1])
+
+def main():
+    '''show corpus lookup times and solver times'''
+    parser = argparse.ArgumentParser(description="substitution-cipher solver benchmark")
+    parser.add_argument('cipher_file', type=str, help='enciphered text file')
+    parser.add_argument('corpus_file', type=str, help='corpus text file')
+    parser.add_argument('-queries', type=int, default=200,
+                        help='number of common corpus words to look up with each letter unknown')
+    parser.add_argument('-runs', type=int, default=1, help='number of times to run each solver')
+    args = parser.parse_args()
+
+    _, corpus_words = word_counts_short_and_long(args.corpus_file, 1)
+    queries = lookup_queries(corpus_words, args.queries)
+    build, first, again, scan = time_lookups(corpus_words, queries)
+    print("lookups: %d queries over %d corpus words" % (len(queries), len(corpus_words)))
+    print("%10s  %10s  %10s  %10s  %10s" % ('build', 'first', 'again', 'scan', 'speedup'))
+    print("%10.3f  %10.3f  %10.3f  %10.3f  %9.0fx" % (build, first, again, scan, scan / max(again, 1e-9)))
+    print()
+    print("solvers: %s with %s" % (args.cipher_file, args.corpus_file))
+    print("%12s  %8s  %8s  %8s" % ('solver', 'init', 'solve', 'score'))
+    for solver in SOLVERS:
+        for _ in range(args.runs):
+            times = time_solver(solver, args.cipher_file, args.corpus_file)
+            print("%12s  %8.3f  %8.3f  %8d" % (solver, times['init'], times['solve'], times['score']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+'''Corpus word index shared by the substitution-cipher solvers (subs_cipher.py and
+../rwords.py), so that finding the corpus words a partially deciphered word could be
+is a dict lookup instead of a scan of the whole corpus:
+    by_pattern      (length, letter-repetition pattern) -> words, e.g. 'that' -> (0, 1, 2, 0)
+    by_wildcard     word with one letter replaced by '_' -> words, e.g. 'th_t' -> ['that']
+Words in each list keep their corpus order (most common first), so a solver that takes
+the first best candidate picks the same word as it would by scanning corpus.most_common().
+The wildcard entries for each word length are built on the first lookup of that length.
+Scripts in this directory import it as cipher_index; ../rwords.py as subs.cipher_index.
+
+    >>> from collections import Counter
+    >>> corpus = Counter({'then': 3, 'that': 5, 'them': 3, 'than': 4, 'the': 9, 'she': 2, 'high': 1})
+    >>> index = CorpusIndex(corpus)
+    >>> index.words_matching_1_unknown('th_n'), index.wildcard_lengths
+    (['than', 'then'], {4})
+    >>> index.words_matching_1_unknown('_he'), index.wildcard_lengths == {3, 4}
+    (['the', 'she'], True)
+    >>> queries = [word[:idx] + UNKNOWN + word[idx + 1:] for word in corpus for idx in range(len(word))]
+    >>> all(index.words_matching_1_unknown(query) == index.scan_1_unknown(query) for query in queries)
+    True
+    >>> order = [word for word, _ in corpus.most_common()]
+    >>> all(index.words_matching_1_unknown(query) == [word for word in order if word in
+    ...     index.words_matching_1_unknown(query)] for query in queries)
+    True
+    >>> index.words_matching_1_unknown('the_'), index.words_matching_1_unknown('xyz_z')
+    (['then', 'them'], [])
+    >>> index.words_matching_pattern('abca'), index.words_matching_pattern('xyzx', 't___')
+    (['that', 'high'], ['that'])
+'''
+
+from collections import defaultdict
+
+UNKNOWN = '_'
+
+def letter_pattern(word):
+    '''Returns the letter-repetition pattern of word as a tuple of the index of the
+    first occurrence of each letter, so 'that' and 'high' both give (0, 1, 2, 0).'''
+    first = {}
+    return tuple(first.setdefault(char, len(first)) for char in word)
+
+class CorpusIndex:
+    '''Index of corpus words by length and letter pattern, and by one-letter wildcards.'''
+    def __init__(self, corpus_words):
+        '''corpus_words is a Counter of words, indexed in most_common order'''
+        self.by_pattern = defaultdict(list)
+        self.by_length = defaultdict(list)
+        for word, _ in corpus_words.most_common():
+            self.by_pattern[(len(word), letter_pattern(word))].append(word)
+            self.by_length[len(word)].append(word)
+        self.by_wildcard = {}
+        self.wildcard_lengths = set()
+
+    def _index_wildcards(self, length):
+        '''Add the wildcard entries for every word of this length.'''
+        by_wildcard = self.by_wildcard
+        for word in self.by_length[length]:
+            for idx in range(length):
+                key = word[:idx] + UNKNOWN + word[idx + 1:]
+                if key in by_wildcard:
+                    by_wildcard[key].append(word)
+                else:
+                    by_wildcard[key] = [word]
+        self.wildcard_lengths.add(length)
+
+    def words_matching_1_unknown(self, deciphered):
+        '''Returns the list of corpus words that match deciphered, which has exactly
+        one unknown letter (UNKNOWN) and all the others known.  Do not modify it.'''
+        if len(deciphered) not in self.wildcard_lengths:
+            self._index_wildcards(len(deciphered))
+        return self.by_wildcard.get(deciphered, [])
+
+    def words_matching_pattern(self, ciph, deciphered=None):
+        '''Returns the corpus words with the same length and letter pattern as the cipher
+        word ciph that also agree with every known letter in deciphered, if given.'''
+        words = self.by_pattern.get((len(ciph), letter_pattern(ciph)), [])
+        if deciphered is None:
+            return list(words)
+        known = [(idx, char) for idx, char in enumerate(deciphered) if char != UNKNOWN]
+        return [word for word in words if all(word[idx] == char for idx, char in known)]
+
+    def scan_1_unknown(self, deciphered):
+        '''Same result as words_matching_1_unknown, by scanning all words of the same
+        length; for testing and benchmarking the index.'''
+        idx_unknown = deciphered.index(UNKNOWN)
+        return [word for word in self.by_length[len(deciphered)]
+                if all(word[idx] == deciphered[idx] for idx in range(len(word)) if idx != idx_unknown)]
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
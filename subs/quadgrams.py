@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+'''Quadgram scoring and stochastic search for simple substitution cipher keys,
+used by SubCipher.solve_quadgrams in subs_cipher.py.
+
+A key is a list of 26 ints mapping each cipher letter (0 for 'a', ...) to a plain letter.
+The score of a key is the log10 likelihood of the deciphered letters (with case and all
+non-letters dropped) under a quadgram model counted from a corpus.  Search starts from a
+random key and swaps the plain letters of two cipher letters at a time, keeping the swap
+if it raises the score (hill climbing) or, when annealing, sometimes even if it lowers
+it.  Each restart is independent, so restarts can run in parallel processes.
+Only the cipher quadgrams containing one of the two swapped letters are rescored.
+'''
+
+import math
+import multiprocessing
+import random
+from collections import Counter
+
+NUM_LETTERS = 26
+NUM_QUADS = NUM_LETTERS ** 4
+FLOOR_COUNT = 0.01      # pseudo-count of quadgrams never seen in the corpus
+
+def read_letters(path):
+    '''Returns the list of ASCII letters in a text file as ints 0-25, ignoring case.'''
+    letters = []
+    with open(path, 'r', encoding='utf8', errors='replace') as text:
+        for line in text:
+            for char in line.lower():
+                if 'a' <= char <= 'z':
+                    letters.append(ord(char) - 97)
+    return letters
+
+def quadgram_log_probs(letters):
+    '''Returns a list of the log10 probability of each quadgram of letters, indexed by
+    ((a*26 + b)*26 + c)*26 + d, with unseen quadgrams given FLOOR_COUNT.'''
+    counts = [0] * NUM_QUADS
+    quad = 0
+    for pos, letter in enumerate(letters):
+        quad = (quad * NUM_LETTERS + letter) % NUM_QUADS
+        if pos >= 3:
+            counts[quad] += 1
+    total = max(len(letters) - 3, 1)
+    log_total = math.log10(total)
+    floor = math.log10(FLOOR_COUNT) - log_total
+    return [math.log10(count) - log_total if count else floor for count in counts]
+
+def cipher_quadgrams(letters):
+    '''Returns a list of (count, (a, b, c, d)) for each distinct quadgram in letters.'''
+    counter = Counter(tuple(letters[pos:pos + 4]) for pos in range(len(letters) - 3))
+    return [(count, quad) for quad, count in counter.items()]
+
+class QuadgramScorer:
+    '''Scores keys against the quadgrams of one ciphertext, incrementally across swaps.'''
+    def __init__(self, log_probs, quads):
+        self.log_probs = log_probs
+        self.quads = quads
+        self.quads_by_letter = [[] for _ in range(NUM_LETTERS)]
+        for idx, (_, quad) in enumerate(quads):
+            for letter in set(quad):
+                self.quads_by_letter[letter].append(idx)
+
+    def quad_score(self, key, idx):
+        '''score of quadgram number idx deciphered with key, times its count'''
+        count, (one, two, three, four) = self.quads[idx]
+        return count * self.log_probs[((key[one] * NUM_LETTERS + key[two]) * NUM_LETTERS + key[three])
+                                      * NUM_LETTERS + key[four]]
+
+    def quad_scores(self, key):
+        '''list of the scores of all the quadgrams deciphered with key'''
+        return [self.quad_score(key, idx) for idx in range(len(self.quads))]
+
+    def swap_change(self, key, scores, one, two):
+        '''Returns the score change and list of (idx, new score) for swapping the plain
+        letters of cipher letters one and two in key, leaving key as it was.'''
+        key[one], key[two] = key[two], key[one]
+        changes = [(idx, self.quad_score(key, idx)) for idx in self.quads_by_letter[one]]
+        changes.extend((idx, self.quad_score(key, idx)) for idx in self.quads_by_letter[two]
+                       if one not in self.quads[idx][1])
+        key[one], key[two] = key[two], key[one]
+        return sum(new - scores[idx] for idx, new in changes), changes
+
+    def climb(self, rng, max_stale=2000, temperature=0.0, cooling=0.999):
+        '''One restart from a random key: swap until max_stale swaps in a row fail to
+        find a better key.  With temperature > 0, a worse swap is accepted with probability
+        exp(change / temperature), and temperature is multiplied by cooling after each try.
+        Returns the best (score, key) found.'''
+        key = list(range(NUM_LETTERS))
+        rng.shuffle(key)
+        scores = self.quad_scores(key)
+        score = sum(scores)
+        best_score, best_key = score, list(key)
+        stale = 0
+        while stale < max_stale:
+            one, two = rng.sample(range(NUM_LETTERS), 2)
+            change, changes = self.swap_change(key, scores, one, two)
+            if change > 0 or (temperature > 0 and rng.random() < math.exp(change / temperature)):
+                key[one], key[two] = key[two], key[one]
+                for idx, new in changes:
+                    scores[idx] = new
+                score += change
+            if score > best_score + 1e-9:
+                best_score, best_key = score, list(key)
+                stale = 0
+            else:
+                stale += 1
+            temperature *= cooling
+        return sum(self.quad_scores(best_key)), best_key
+
+_WORKER_SCORER = None
+
+def _init_worker(log_probs, quads):
+    '''Pool initializer: build the scorer once per worker process.'''
+    global _WORKER_SCORER
+    _WORKER_SCORER = QuadgramScorer(log_probs, quads)
+
+def _climb_worker(args):
+    '''Pool task: one restart with its own random seed.'''
+    seed, max_stale, temperature, cooling = args
+    return _WORKER_SCORER.climb(random.Random(seed), max_stale, temperature, cooling)
+
+def search_key(log_probs, quads, restarts=8, processes=1, seed=None, max_stale=2000,
+               temperature=0.0, cooling=0.999, verbose=0):
+    '''Run restarts independent climbs, in that many processes if processes > 1,
+    and return the best (score, key) of them all.'''
+    rng = random.Random(seed)
+    tasks = [(rng.getrandbits(64), max_stale, temperature, cooling) for _ in range(restarts)]
+    if processes > 1:
+        with multiprocessing.Pool(processes, _init_worker, (log_probs, quads)) as pool:
+            results = pool.map(_climb_worker, tasks)
+    else:
+        _init_worker(log_probs, quads)
+        results = [_climb_worker(task) for task in tasks]
+    if verbose > 0:
+        for restart, (score, _) in enumerate(results):
+            print("Restart {:3}  score {:.2f}".format(restart, score))
+    return max(results, key=lambda result: result[0])
@@ -3,7 +3,7 @@
 '''Class and driver script to solve simple substitution cipher from
 a corpus and encoded text in separate text files.
 
-Usage: python3 subs_cipher.py [cipher_file [corpus_file [verbosity]]]
+Usage: python3 subs_cipher.py [cipher_file [corpus_file [verbosity]]] [-quadgrams [options]]
 Where:
     The cipher_file contains text (at least mostly English) in which
     every lower [upper[ case ASCII letter has been replaced by the
@@ -25,13 +25,19 @@ Verbosity levels:
     4   Messages pertaining to the queue of cipher words being matched
     6   Every partially decoded cipher word, every time a possible
         change to the cipher key is evaluated (very verbose).
+With -quadgrams, the key is instead found by hill climbing (or, with -anneal,
+simulated annealing) on quadgram log-likelihood, with random restarts that can
+run in parallel processes (-restarts, -processes).  See quadgrams.py.
 '''
 
+import argparse
 import heapq
 import re
 import sys
 from collections import defaultdict
 from collections import Counter
+from cipher_index import CorpusIndex
+import quadgrams
 
 class SubCipher:
     '''Solver to infer a simple substituion cipher based on a large
@@ -45,10 +51,13 @@ class SubCipher:
         self.corpus_len_1, self.corpus_words = word_counts_short_and_long(corpus_file, 1)
         self.cipher_chars = count_chars_from_words(self.cipher_words)
         self.corpus_chars = count_chars_from_words(self.corpus_words)
+        self.corpus_index = CorpusIndex(self.corpus_words)
         self.forward_map = defaultdict(int)
         self.inverse_map = defaultdict(int)
-        self.inverse_score = 0
         self.verbose = verbose
+        self.ciphs_by_char = index_words_by_chars(self.cipher_words)
+        self.word_scores = {ciph: 0 for ciph in self.cipher_words}
+        self.inverse_score = 0      # running total of self.word_scores
         if self.verbose > 1:
             print("The dozen most common corpus words and their counts:")
             for word, count in self.corpus_words.most_common(12):
@@ -93,6 +102,33 @@ class SubCipher:
         self.write_forward_cipher_key(self.cipher_file + ".key")
         self.write_deciphered_text(self.cipher_file + ".decoded")
 
+    def solve_quadgrams(self, restarts=8, processes=1, seed=None, max_letters=3000,
+                        temperature=0.0, max_stale=2000):
+        '''Alternative to solve that does not bootstrap from common words: search for the
+        key that maximizes the quadgram log-likelihood of (up to max_letters letters of)
+        the deciphered text, using quadgram counts from the corpus, with random restarts
+        spread over processes.  Then output the key and text as solve does.'''
+        log_probs = quadgrams.quadgram_log_probs(quadgrams.read_letters(self.corpus_file))
+        cipher_letters = quadgrams.read_letters(self.cipher_file)
+        if max_letters:
+            cipher_letters = cipher_letters[:max_letters]
+        quads = quadgrams.cipher_quadgrams(cipher_letters)
+        score, key = quadgrams.search_key(log_probs, quads, restarts, processes, seed,
+                                          max_stale, temperature, verbose=self.verbose)
+        for ciph_char in [ciph for ciph, corp in self.inverse_map.items() if corp]:
+            self.forward_map[self.inverse_map[ciph_char]] = 0
+            self.set_inverse(ciph_char, 0)
+        for ciph_idx, corp_idx in enumerate(key):
+            self.assign(chr(corp_idx + ord('a')), chr(ciph_idx + ord('a')))
+        if self.verbose > 0:
+            print("Best quadgram score {:.2f} from {} letters; matched word score {}".format(
+                score, len(cipher_letters), self.inverse_score))
+        self.print_forward_map()
+        self.print_deciphered_lines()
+        self.write_forward_cipher_key(self.cipher_file + ".key")
+        self.write_deciphered_text(self.cipher_file + ".decoded")
+        return score
+
     def assign(self, corp, ciph):
         '''Assigns corpus char -> cipher char in the forward cipher map,
         and the opposite in the inverse map.  Asserts that these character
@@ -104,7 +140,7 @@ class SubCipher:
             "Cannot inverse assign {} -> {} because already {} -> {}"
             .format(corp, ciph, self.inverse_map[ciph], ciph))
         self.forward_map[corp] = ciph
-        self.inverse_map[ciph] = corp
+        self.set_inverse(ciph, corp)
         if self.verbose > 1:
             print("Accept", corp, "->", ciph)
 
@@ -184,8 +220,6 @@ class SubCipher:
         by scoring how many decoded cipher words then match corpus words.
         The highest score wins.  (That is, the decision is immediate, not
         defered to accumulate multiple scoring passes or backpropagating votes.'''
-        num_words = len(self.corpus_words)
-        corpus = self.corpus_words.most_common(num_words) # Just try them all
         inverse_pq = [] # priority = [num_unknown (updated on pop), -count, length]
         for ciph, count in self.cipher_words.items():
             entry = [self.number_of_unknowns(ciph), -count, len(ciph), ciph]
@@ -198,7 +232,7 @@ class SubCipher:
                 continue
             num_unk, idx_unk = self.num_idx_unknown(ciph)   # update (unknowns can become known)
             if num_unk == 1:
-                self.inverse_match_1_unknown(ciph, length, idx_unk, corpus)
+                self.inverse_match_1_unknown(ciph, idx_unk)
 
             elif num_unk > 1:
                 if ciph == sentinel:
@@ -216,34 +250,22 @@ class SubCipher:
                 print('\tAlready deciphered: ', num_unk, -neg_count, ciph
                       , self.decipher_word(ciph))
 
-    def inverse_match_1_unknown(self, ciph, length, idx_unknown, corpus):
+    def inverse_match_1_unknown(self, ciph, idx_unknown):
         '''Try to match one cipher word with a single unknown against all
-        corpus words of same length.  Accept the match that maximaly
-        improves the total score (if there is any such a match).'''
+        corpus words of same length, as looked up in the corpus index.  Accept
+        the match that maximaly improves the total score (if there is any such a match).'''
         if self.verbose > 3:
             print('Trying to match cipher word {} at index {}'.format(ciph, idx_unknown))
-        self.inverse_score = self.score_inverse_map()
         ciph_char = ciph[idx_unknown]
         max_score = 0
         max_word = ''
         deciphered = self.decipher_word(ciph)
-        for word, _ in corpus:
-            if len(word) == length:
-                # Match inverted ciphers to word chars
-                for idx in range(length):
-                    if idx == idx_unknown:
-                        continue            # skip over the single unknown
-                    if word[idx] != deciphered[idx]:
-                        break               # break on the first known mismatch
-                else:                       # all known chars matched, hole excluded
-                    # Compute the total score that would result from accepting this mapping
-                    word_char = word[idx_unknown]
-                    self.inverse_map[ciph_char] = word_char # create temporary inverse mapping
-                    try_score = self.score_inverse_map()    # compute score with this mapping
-                    self.inverse_map[ciph_char] = 0         # delete temporary inverse mapping
-                    if max_score < try_score:
-                        max_score = try_score
-                        max_word = word
+        for word in self.corpus_index.words_matching_1_unknown(deciphered):
+            # Compute the total score that would result from accepting this mapping
+            try_score = self.inverse_score + self.score_change(ciph_char, word[idx_unknown])
+            if max_score < try_score:
+                max_score = try_score
+                max_word = word
 
         if max_score > self.inverse_score:
             self.update_mapping_on_better_score(ciph, idx_unknown, max_word, max_score)
@@ -265,15 +287,44 @@ class SubCipher:
                     max_char, self.forward_map[max_char], count,
                     ciph, old_word, self.inverse_score))
             self.forward_map[max_char] = 0
-            self.inverse_map[old_forward] = 0
+            self.set_inverse(old_forward, 0)
         if self.verbose > 0:
             print("Assign {} -> {} because {} x '{}' => '{}' gives new score {} > {}".format(
                 max_char, ciph_char, count, ciph, max_word, max_score, self.inverse_score))
-        self.inverse_score = max_score
         self.assign(max_char, ciph_char)
 
+    def score_word(self, ciph):
+        '''score of one cipher word: its count times its length if it deciphers to a corpus word, else 0'''
+        return self.cipher_words[ciph] * len(ciph) if self.corpus_words[self.decipher_word(ciph)] else 0
+
+    def set_inverse(self, ciph_char, word_char):
+        '''Set (or with word_char = 0, delete) the inverse mapping of ciph_char, and
+        update the running score by rescoring only the cipher words containing ciph_char.'''
+        self.inverse_map[ciph_char] = word_char
+        word_scores = self.word_scores
+        for ciph in self.ciphs_by_char[ciph_char]:
+            score = self.score_word(ciph)
+            self.inverse_score += score - word_scores[ciph]
+            word_scores[ciph] = score
+
+    def score_change(self, ciph_char, word_char):
+        '''Returns the change in the total score that inverse mapping ciph_char to word_char
+        would make, by rescoring only the cipher words containing ciph_char.  Leaves the map as is.'''
+        old_char = self.inverse_map[ciph_char]
+        self.inverse_map[ciph_char] = word_char     # create temporary inverse mapping
+        word_scores = self.word_scores
+        change = 0
+        for ciph in self.ciphs_by_char[ciph_char]:
+            score = self.score_word(ciph)
+            if self.verbose > 5:
+                print(" {:9}\t {} => {}".format(score, ciph, self.decipher_word(ciph)))
+            change += score - word_scores[ciph]
+        self.inverse_map[ciph_char] = old_char      # restore the inverse mapping
+        return change
+
     def score_inverse_map(self):
-        '''score based on totality of deciphered cipher words matching corpus words'''
+        '''score based on totality of deciphered cipher words matching corpus words.
+        Recomputed from scratch; self.inverse_score keeps the same total incrementally.'''
         score_total = 0
         for ciph, ciph_count in self.cipher_words.items():
             word = self.decipher_word(ciph)
@@ -459,6 +510,14 @@ def word_counts_short_and_long(path, max_short_len):
             other_counter.update(other)
     return short_counter, other_counter
 
+def index_words_by_chars(word_counter):
+    '''Returns a dict mapping each char to the list of distinct words containing it'''
+    words_by_char = defaultdict(list)
+    for word in word_counter:
+        for char in set(word):
+            words_by_char[char].append(word)
+    return words_by_char
+
 def count_chars_from_words(word_counter):
     '''Count chars from all words times their counts'''
     char_counter = Counter()
@@ -478,21 +537,31 @@ def solve_simple_substition_cipher(cipher_file, corpus_file, verbose):
 
 def main():
     '''Get file names for cipher and corpus texts and call
-    solve_simple_substition_cipher.'''
-
-    # simple, inflexible arg parsing:
-    argc = len(sys.argv)
-    if argc > 4:
-        print(sys.argv[0])
-        print(__doc__)
-        exit(0)
-
-    # Get the paths to the files (relative or absolute)
-    cipher_file = sys.argv[1] if argc > 1 else r'cipher.txt.bak'
-    corpus_file = sys.argv[2] if argc > 2 else r'corpus.txt.bak'
-    verbose = int(sys.argv[3]) if argc > 3 else 3
-
-    solve_simple_substition_cipher(cipher_file, corpus_file, verbose)
+    solve_simple_substition_cipher, or solve by quadgrams.'''
+    parser = argparse.ArgumentParser(description="solve a simple substitution cipher")
+    parser.add_argument('cipher_file', type=str, nargs='?', default=r'cipher.txt.bak',
+                        help='enciphered text file (default: %(default)s)')
+    parser.add_argument('corpus_file', type=str, nargs='?', default=r'corpus.txt.bak',
+                        help='corpus text file (default: %(default)s)')
+    parser.add_argument('verbose', type=int, nargs='?', default=3,
+                        help='verbosity (default: %(default)s)')
+    parser.add_argument('-quadgrams', action='store_true',
+                        help='solve by quadgram hill climbing instead of word matching')
+    parser.add_argument('-restarts', type=int, default=8, help='quadgram random restarts (default: %(default)s)')
+    parser.add_argument('-processes', type=int, default=1,
+                        help='processes to run the quadgram restarts in (default: %(default)s)')
+    parser.add_argument('-anneal', type=float, default=0.0,
+                        help='initial annealing temperature; 0 means pure hill climbing (default: %(default)s)')
+    parser.add_argument('-max_letters', type=int, default=3000,
+                        help='quadgram-score at most this many cipher letters; 0 for all (default: %(default)s)')
+    parser.add_argument('-seed', type=int, default=None, help='random seed for the quadgram restarts')
+    args = parser.parse_args()
+
+    if args.quadgrams:
+        subs = SubCipher(args.cipher_file, args.corpus_file, args.verbose)
+        subs.solve_quadgrams(args.restarts, args.processes, args.seed, args.max_letters, args.anneal)
+    else:
+        solve_simple_substition_cipher(args.cipher_file, args.corpus_file, args.verbose)
 
 
 if __name__ == '__main__':
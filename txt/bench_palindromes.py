@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+'''
+Benchmark the two-word palindrome finders in string2words.py against each other on a
+dictionary file (words.txt by default), or on a sorted random sample of it, since the
+naive finder is N-squared.  Each finder's results are checked against the naive
+finder's (if it ran), or else the trie finder's, and then the trie finder is timed on
+a few multi-word palindromes.
+Usage: python bench_palindromes.py [dictionary_file] [-sample N] [-functions ...]
+'''
+
+import argparse
+import itertools
+import random
+import time
+import string2words
+
+WORDS_PATH = string2words.WORDS_PATH
+FINDERS = ['two_word_palindromes_naive', 'two_word_palindromes_sophomore',
+           'two_word_palindromes', 'two_word_palindromes_trie']
+
+def sample_dictionary(dictionary, size, seed=0):
+    '''dict of a random sample of size words from dictionary, in its original order'''
+    if not size or size >= len(dictionary):
+        return dictionary
+    chosen = set(random.Random(seed).sample(list(dictionary), size))
+    return {word: length for word, length in dictionary.items() if word in chosen}
+
+def time_finder(name, dictionary):
+    '''Returns (seconds, set of results, error message or None) from the named finder.'''
+    beg = time.perf_counter()
+    try:
+        results = getattr(string2words, name)(dictionary, verbose=0)
+    except Exception as ex:     # some of the old finders fail on some dictionaries
+        return time.perf_counter() - beg, set(), repr(ex)
+    return time.perf_counter() - beg, set(results), None
+
+def time_multi_word(dictionary, max_words, count):
+    '''Returns seconds to build a PalindromeFinder and to take count palindromes of up to max_words words.'''
+    beg = time.perf_counter()
+    finder = string2words.PalindromeFinder(dictionary)
+    built = time.perf_counter()
+    taken = list(itertools.islice(finder.palindromes(max_words), count))
+    return built - beg, time.perf_counter() - built, taken
+
+def main():
+    '''time the palindrome finders and compare their results'''
+    parser = argparse.ArgumentParser(description="two-word palindrome finder benchmark")
+    parser.add_argument('dictionary_file', type=str, nargs='?', default=WORDS_PATH,
+                        help='dictionary file, one word per line (default: %(default)s)')
+    parser.add_argument('-sample', type=int, default=5000,
+                        help='number of dictionary words to sample; 0 for all (default: %(default)s)')
+    parser.add_argument('-seed', type=int, default=0, help='random seed for the sample')
+    parser.add_argument('-functions', type=str, nargs='*', default=FINDERS, choices=FINDERS,
+                        help='finders to run (default: all)')
+    parser.add_argument('-max_naive', type=int, default=20000,
+                        help='skip the naive finder on more words than this (default: %(default)s)')
+    parser.add_argument('-max_words', type=int, default=3,
+                        help='most words per palindrome for the multi-word trial (default: %(default)s)')
+    parser.add_argument('-count', type=int, default=1000,
+                        help='number of multi-word palindromes to take (default: %(default)s)')
+    args = parser.parse_args()
+
+    string2words.load_dictionary(args.dictionary_file)
+    dictionary = sample_dictionary(string2words.DICTIONARY, args.sample, args.seed)
+    print("two-word palindromes in %d words from %s" % (len(dictionary), args.dictionary_file))
+    print("%32s  %9s  %8s  %8s  %8s" % ('finder', 'seconds', 'found', 'missing', 'extra'))
+    runs = {}
+    for name in args.functions:
+        if name == 'two_word_palindromes_naive' and len(dictionary) > args.max_naive:
+            print("%32s  skipped: more than %d words" % (name, args.max_naive))
+            continue
+        runs[name] = time_finder(name, dictionary)
+    reference = runs.get('two_word_palindromes_naive', runs.get('two_word_palindromes_trie'))
+    for name, (seconds, results, error) in runs.items():
+        if error:
+            print("%32s  %9.3f  failed: %s" % (name, seconds, error))
+        elif reference:
+            print("%32s  %9.3f  %8d  %8d  %8d" % (name, seconds, len(results), len(reference[1] - results),
+                                                  len(results - reference[1])))
+        else:
+            print("%32s  %9.3f  %8d" % (name, seconds, len(results)))
+
+    build, take, taken = time_multi_word(dictionary, args.max_words, args.count)
+    print()
+    print("PalindromeFinder: built in %.3f seconds; took %d palindromes of up to %d words in %.3f seconds"
+          % (build, len(taken), args.max_words, take))
+    for phrase in taken[-5:]:
+        print("\t", phrase)
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,15 @@
     syllable-boundary data from a dictionary.  Many more patterns can be added
     and tested, if useless or error-causing patterns can be jettisoned.
 
+    Standard TeX pattern files (hyph-*.pat.txt and hyph-*.hyp.txt, as in
+    the hyph-utf8 package) for any language can be loaded with load_hyphenator.
+    Compiled patterns are cached on disk, keyed by a hash of their contents,
+    so only the first use of a pattern set pays for building its tables.
+    The cache is in $HYPHENATE_CACHE_DIR if set, else in hyphenate/ under the
+    user cache directory ($XDG_CACHE_HOME or ~/.cache); never in the source tree.
+    These examples build the default patterns without the disk cache:
+
+    >>> HYPHENATOR = cached_hyphenator(PATTERNS, EXCEPTIONS, compiled_dir=None)
     >>> HYPHENATOR.syllab_points("hyphenation")
     [0, 0, 0, 3, 0, 0, 2, 5, 4, 2, 0, 2, 0, 0]
     >>> HYPHENATOR.hyphen_points("hyphenation")
@@ -39,16 +48,35 @@
     ['win', 'dy']
     >>> HYPHENATOR.word_syllables("manchurian")
     ['man', 'chur', 'i', 'an']
+    >>> HYPHENATOR.syllab_points_many(["windy", "project"])
+    [[0, 0, 4, 2, 3, 2, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0, 0]]
 
     Ned Batchelder, July 2007.
     This Python code is in the public domain.
     Modifications by Sprax Lines 2017.10.04 are also public domain.
 """
 
+import argparse
+import hashlib
+import os
+import os.path
+import pickle
 import re
+from lru_cache import LruCache
 
 __version__ = '1.0.20070709'
 
+COMPILED_VERSION = 1
+
+def default_compiled_dir():
+    '''$HYPHENATE_CACHE_DIR if set, else hyphenate/ in the user cache directory'''
+    if os.environ.get('HYPHENATE_CACHE_DIR'):
+        return os.environ['HYPHENATE_CACHE_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'hyphenate')
+
+COMPILED_DIR = default_compiled_dir()
+
 def syllabify(word, points):
     """ Given a word and syllable breaking points, returns a list of
         syllables separated at the possible hyphenation points, even
@@ -64,15 +92,34 @@ def syllabify(word, points):
 
 class Hyphenator:
     '''Hyhenate or syllabify words based on Liang, Knuth, Kuiken (TeX); Batchelder.'''
-    def __init__(self, patterns, exceptions=''):
+    def __init__(self, patterns, exceptions='', cache_size=10000):
         self.tree = {}
         for pattern in patterns.split():
             self._insert_pattern(pattern)
+        self._compile()
+        self.cache = LruCache(cache_size)
 
         self.exceptions = {}
         for ex in exceptions.split():
             # Convert the hyphenated pattern into a point array for use later.
-            self.exceptions[ex.replace('-', '')] = [0] + [int(h == '-') for h in re.split(r"[a-z]", ex)]
+            self.exceptions[ex.replace('-', '').lower()] = [0] + [int(h == '-') for h in re.split(r"[^-]", ex)]
+
+    @classmethod
+    def from_compiled(cls, compiled, cache_size=10000):
+        '''Returns a Hyphenator made from the dict returned by the compiled method, without a tree.'''
+        hyphenator = cls.__new__(cls)
+        hyphenator.tree = None
+        hyphenator.char_ids = compiled['char_ids']
+        hyphenator.trans = compiled['trans']
+        hyphenator.state_points = compiled['state_points']
+        hyphenator.exceptions = compiled['exceptions']
+        hyphenator.cache = LruCache(cache_size)
+        return hyphenator
+
+    def compiled(self):
+        '''dict of the compiled tables and exceptions, which is all that from_compiled needs'''
+        return {'char_ids': self.char_ids, 'trans': self.trans,
+                'state_points': self.state_points, 'exceptions': self.exceptions}
 
     def _insert_pattern(self, pattern):
         '''
@@ -80,7 +127,7 @@ class Hyphenator:
         and a list of points [0, 1, 0, 3, 4].
         '''
         chars = re.sub('[0-9]', '', pattern)
-        points = [int(d or 0) for d in re.split("[.a-z]", pattern)]
+        points = [int(d or 0) for d in re.split(r"\D", pattern)]
 
         # Insert the pattern into the tree.  Each character finds a dict
         # another level down in the tree, and leaf nodes have the list of
@@ -92,31 +139,88 @@ class Hyphenator:
             tree = tree[char]
         tree[None] = points
 
+    def _compile(self):
+        '''
+        Compile the tree into an Aho-Corasick automaton stored as a packed transition table,
+        so that finding every pattern in a word takes one pass over its chars.  States are
+        numbered breadth first from the root (0).  The next state after state S on the char
+        with ID C is self.trans[S * len(self.char_ids) + C] (chars not in any pattern go back
+        to the root).  self.state_points[S] holds the nonzero (offset, point) pairs of the max
+        of the points of every pattern that ends at S, with offsets relative to the end.
+        '''
+        chars = set()
+        nodes = [self.tree]
+        for node in nodes:
+            for char, child in node.items():
+                if char is not None:
+                    chars.add(char)
+                    nodes.append(child)
+        self.char_ids = {char: cid for cid, char in enumerate(sorted(chars))}
+        nchars = len(self.char_ids)
+        self.trans = [0] * nchars
+        self.state_points = [()]
+        fails = [0]
+        queue = [(self.tree, 0, 0)]                 # (node, state, depth)
+        for node, state, depth in queue:
+            row = state * nchars
+            for char, child in sorted(node.items(), key=lambda item: item[0] or ''):
+                if char is None:
+                    continue
+                cid = self.char_ids[char]
+                child_state = len(self.state_points)
+                # The longest proper suffix of the child's string that is a trie path.
+                fail = self.trans[fails[state] * nchars + cid] if state else 0
+                fails.append(fail)
+                points = dict(self.state_points[fail])
+                for jdx, pnt in enumerate(child.get(None, ())):
+                    if pnt > points.get(jdx - depth - 1, 0):
+                        points[jdx - depth - 1] = pnt
+                self.state_points.append(tuple(sorted(points.items())))
+                self.trans[row + cid] = child_state
+                self.trans.extend([0] * nchars)
+                queue.append((child, child_state, depth + 1))
+            if state:
+                # Missing transitions follow the failure link, whose row is already complete.
+                fail_row = fails[state] * nchars
+                for cid in range(nchars):
+                    if not self.trans[row + cid]:
+                        self.trans[row + cid] = self.trans[fail_row + cid]
+
+    def _match_points(self, lword):
+        '''syllable points of a lowercased word that is not an exception, by the automaton'''
+        work = '.' + lword + '.'
+        points = [0] * (len(work) + 1)
+        trans, state_points, char_ids, nchars = self.trans, self.state_points, self.char_ids, len(self.char_ids)
+        state = 0
+        for end, char in enumerate(work, 1):
+            cid = char_ids.get(char)
+            state = 0 if cid is None else trans[state * nchars + cid]
+            for off, pnt in state_points[state]:
+                if pnt > points[end + off]:
+                    points[end + off] = pnt
+        return points
+
     def syllab_points(self, word):
         """ Given a word, returns a list of possible hyphenation points,
         even if they are close to the beginning or end of the word.
+        Results for recent words are kept in self.cache.
         """
-        # If the word is an exception, get the stored points.
-        if word.lower() in self.exceptions:
-            points = self.exceptions[word.lower()]
-        else:
-            work = '.' + word.lower() + '.'
-            points = [0] * (len(work)+1)
-            for i in range(len(work)):
-                tree = self.tree
-                for char in work[i:]:
-                    if char in tree:
-                        tree = tree[char]
-                        if None in tree:
-                            pnts = tree[None]
-                            # print("tree nodes(%s): " % char, tree)
-                            # print()
-                            for jdx, pnt in enumerate(pnts):
-                                points[i + jdx] = max(points[i + jdx], pnt)
-                    else:
-                        break
-        # print("points: ", points)
-        return points
+        lword = word.lower()
+        points = self.cache.lookup(lword)
+        if points is None:
+            # If the word is an exception, get the stored points.
+            if lword in self.exceptions:
+                points = tuple(self.exceptions[lword])
+            else:
+                points = tuple(self._match_points(lword))
+            self.cache.store(lword, points)
+        return list(points)
+
+    def syllab_points_many(self, words):
+        """ Given an iterable of words, returns the list of their lists of
+        possible hyphenation points, as from syllab_points.
+        """
+        return [self.syllab_points(word) for word in words]
 
     def hyphen_points(self, word):
         """ Given a word, returns a list of possible hyphenation points,
@@ -607,11 +711,65 @@ presents project projects reci-procity re-cog-ni-zance ref-or-ma-tion
 ret-ri-bu-tion ta-ble
 """
 
-def get_default_hyphenator():
-    '''returns Hyphenator constructed from default patterns & exceptons.'''
-    return Hyphenator(PATTERNS, EXCEPTIONS)
+def read_pattern_file(path):
+    '''
+    Returns the whitespace-separated patterns or exceptions in a TeX pattern file,
+    such as hyph-en-us.pat.txt or hyph-en-us.hyp.txt, without any % comments.
+    '''
+    with open(path, encoding='utf-8') as pat_file:
+        return ' '.join(line.split('%', 1)[0].strip() for line in pat_file)
+
+def compiled_path(patterns, exceptions='', compiled_dir=COMPILED_DIR):
+    '''path of the cached compiled tables for patterns and exceptions, named by a hash of their contents'''
+    hasher = hashlib.blake2b(str(COMPILED_VERSION).encode('ascii'), digest_size=16)
+    hasher.update(' '.join(patterns.split()).encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(' '.join(exceptions.split()).encode('utf-8'))
+    return os.path.join(compiled_dir, 'hyph_%s.pkl' % hasher.hexdigest())
 
-HYPHENATOR = get_default_hyphenator()
+def cached_hyphenator(patterns, exceptions='', compiled_dir=COMPILED_DIR, cache_size=10000):
+    '''
+    Returns a Hyphenator for patterns and exceptions, loading its compiled tables from
+    compiled_dir if they were saved there before, else building and saving them.
+    A compiled_dir of None means build without the disk cache.
+    '''
+    if compiled_dir is None:
+        return Hyphenator(patterns, exceptions, cache_size)
+    path = compiled_path(patterns, exceptions, compiled_dir)
+    try:
+        with open(path, 'rb') as pkl:
+            return Hyphenator.from_compiled(pickle.load(pkl), cache_size)
+    except (OSError, EOFError, pickle.UnpicklingError, KeyError):
+        pass
+    hyphenator = Hyphenator(patterns, exceptions, cache_size)
+    try:
+        os.makedirs(compiled_dir, exist_ok=True)
+        # Save via a temporary file, so concurrent readers never see a partial file.
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as pkl:
+            pickle.dump(hyphenator.compiled(), pkl, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as ex:
+        print("cached_hyphenator: not saving %s: %s" % (path, ex))
+    return hyphenator
+
+def load_hyphenator(pat_path, hyp_path=None, compiled_dir=COMPILED_DIR, cache_size=10000):
+    '''
+    Returns a Hyphenator for the patterns in the TeX pattern file pat_path and the
+    exceptions (if any) in hyp_path, e.g.  load_hyphenator('hyph-de-1996.pat.txt')
+    '''
+    patterns = read_pattern_file(pat_path)
+    exceptions = read_pattern_file(hyp_path) if hyp_path else ''
+    return cached_hyphenator(patterns, exceptions, compiled_dir, cache_size)
+
+_DEFAULT_HYPHENATOR = None
+
+def get_default_hyphenator():
+    '''returns the Hyphenator for the default patterns & exceptions, built on first use.'''
+    global _DEFAULT_HYPHENATOR
+    if _DEFAULT_HYPHENATOR is None:
+        _DEFAULT_HYPHENATOR = cached_hyphenator(PATTERNS, EXCEPTIONS)
+    return _DEFAULT_HYPHENATOR
 
 # hyphenate_word = hyphenator.hyphenate_word
 # word_syllables = hyphenator.word_syllables
@@ -622,14 +780,27 @@ HYPHENATOR = get_default_hyphenator()
 # del EXCEPTIONS
 
 def main():
-    '''test driver'''
-    import sys
-    if len(sys.argv) > 1:
-        # hyphenator = get_default_hyphenator()
+    '''test driver: hyphenate words, or run the doctests if none are given'''
+    parser = argparse.ArgumentParser(description="hyphenate and syllabify words by Liang's algorithm")
+    parser.add_argument('words', type=str, nargs='*', help='words to hyphenate (default: run doctests)')
+    parser.add_argument('-patterns', type=str, default=None,
+                        help='TeX pattern file, e.g. hyph-en-us.pat.txt (default: built-in patterns)')
+    parser.add_argument('-exceptions', type=str, default=None,
+                        help='TeX exceptions file, e.g. hyph-en-us.hyp.txt')
+    parser.add_argument('-cache_dir', dest='compiled_dir', type=str, default=COMPILED_DIR,
+                        help='directory of compiled patterns (default: %(default)s)')
+    parser.add_argument('-no_cache', dest='compiled_dir', action='store_const', const=None,
+                        help='do not load or save compiled patterns')
+    args = parser.parse_args()
+    if args.words:
+        if args.patterns:
+            hyphenator = load_hyphenator(args.patterns, args.exceptions, args.compiled_dir)
+        else:
+            hyphenator = cached_hyphenator(PATTERNS, EXCEPTIONS, args.compiled_dir)
         print("ORIGINAL \t HYPHENATED \t JOINED \t SYLLABIFIED")
-        for token in sys.argv[1:]:
-            hyphenoms = HYPHENATOR.hyphenate_word(token)
-            syllables = HYPHENATOR.word_syllables(token)
+        for token in args.words:
+            hyphenoms = hyphenator.hyphenate_word(token)
+            syllables = hyphenator.word_syllables(token)
             # print(token, syllables)
             print(token, hyphenoms, '-'.join(hyphenoms), syllables)
     else:
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+'''
+Bounded least-recently-used cache: an OrderedDict with hit and miss counters.
+'''
+from collections import OrderedDict
+
+class LruCache(OrderedDict):
+    '''Dict bounded to max_size items, evicting the least recently used, and counting hits and misses.'''
+
+    def __init__(self, max_size=100000):
+        super().__init__()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, default=None):
+        '''Returns the value for key, marking it as recently used, or default on a miss.'''
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        '''Add or replace key's value, evicting the least recently used item if over max_size.'''
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+        return value
+
+    def stats_str(self):
+        '''hits, misses, hit rate, and size as a str'''
+        total = self.hits + self.misses
+        return "hits %d  misses %d  (hit rate %.3f)  size %d / %d" % (
+            self.hits, self.misses, self.hits / total if total else 0.0, len(self), self.max_size)
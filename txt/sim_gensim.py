@@ -13,6 +13,7 @@ from __future__ import division
 # import nltk
 # import scipy
 import inspect
+import os.path
 import random
 import re
 import string
@@ -24,6 +25,8 @@ import numpy as np
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from scipy.spatial.distance import cosine
+import sim_pairs
+import word2vec_mmap
 
 DEFAULT_MODEL_FILE = '/Users/sprax/asdf/spryt/txt/Text/GoogleNews-vectors-negative300.bin'
 DEFAULT_W2V_MODEL = None
@@ -42,10 +45,19 @@ def init():
         DEFAULT_STOPWORDS = default_stop_words()
     return (DEFAULT_W2V_MODEL, DEFAULT_W2V_VOCAB, DEFAULT_STOPWORDS)
 
-def default_word2vec_model(model_file=DEFAULT_MODEL_FILE, verbose=True):
-    '''Load pre-made word2vec word2vec'''
-    # TODO: Use _save_specials and _load_specials?
+def default_word2vec_model(model_file=DEFAULT_MODEL_FILE, verbose=True, use_mmap=True):
+    '''
+    Load pre-made word2vec model.  If use_mmap and the model has been converted by
+    word2vec_mmap.py, open the memory-mapped copy instead, which takes milliseconds
+    instead of most of a minute, and whose pages are shared by all processes using it.
+    '''
     beg = time.time()
+    prefix = word2vec_mmap.default_prefix(model_file)
+    if use_mmap and os.path.exists(prefix + '.vectors.npy'):
+        word2vec = word2vec_mmap.Word2VecMmap(prefix)
+        if verbose:
+            print("Seconds to open memory-mapped %s: %.3f" % (prefix, time.time() - beg))
+        return word2vec
     word2vec = gensim.models.KeyedVectors.load_word2vec_format(model_file, binary=True)
     if verbose:
         print("Seconds to load_word2vec_format:", time.time() - beg)
@@ -53,7 +65,12 @@ def default_word2vec_model(model_file=DEFAULT_MODEL_FILE, verbose=True):
     return word2vec
 
 def word2vec_vocab(word2vec, verbose=True):
-    '''Initialize vocab as the set of keys from a word2vec word2vec'''
+    '''
+    Initialize vocab as the set of keys from a word2vec model.  A memory-mapped model
+    is its own vocab, since it supports `in` without building a set of 3 million words.
+    '''
+    if isinstance(word2vec, word2vec_mmap.Word2VecMmap):
+        return word2vec
     beg = time.time()
     vocab = set([key for key in word2vec.vocab.keys()])
     if verbose:
@@ -146,9 +163,67 @@ def nearest_neighbors(word2vec, vocab, texts, verbose=False):
         nearests[idx] = max_idx if max_idx < idx else max_idx + 1
     return nearests
 
+class SentenceMatrix:
+    '''
+    Sentence embeddings as a row-normalized float32 matrix: each text is tokenized and its
+    in-vocabulary word vectors summed only once.  Nearest neighbor and top-k queries are then
+    blocked matrix products (see sim_pairs), or, for corpora too large for exact search,
+    lookups in an approximate random-projection LSH index.
+    '''
+
+    def __init__(self, word2vec, vocab, texts, dtype=np.float32):
+        self.word2vec = word2vec
+        self.vocab = vocab
+        self.texts = texts
+        self.dtype = dtype
+        self.matrix = self.embed(texts)
+        self._lsh_index = None
+
+    def embed(self, texts):
+        '''Returns the row-normalized matrix of summed word vectors of texts (zero rows for no known words).'''
+        rows = np.zeros((len(texts), self.word2vec.vector_size), dtype=self.dtype)
+        for idx, txt in enumerate(texts):
+            toks = word_tokens(self.vocab, txt)
+            if toks:
+                rows[idx] = np.sum([self.word2vec[tok] for tok in toks], axis=0)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return rows / norms
+
+    def lsh_index(self, nbits=None, ntables=16, seed=0):
+        '''the approximate index over the matrix, built on first use'''
+        if self._lsh_index is None:
+            self._lsh_index = sim_pairs.RandomProjectionIndex(self.matrix, nbits, ntables, seed)
+        return self._lsh_index
+
+    def nearest_neighbors(self, top_k=None, approximate=False, mem_bytes=sim_pairs.MEM_BYTES):
+        '''
+        For each text, the index of the most (cosine) similar other text, or, if top_k is given,
+        the list of the top_k (index, similarity) pairs.  If approximate, use the LSH index.
+        '''
+        if approximate:
+            return self.lsh_index().list_nearest_other_idx(top_k)
+        return sim_pairs.list_nearest_other_idx(self.matrix, top_k, mem_bytes)
+
+    def query(self, texts, top_k=5, approximate=False, mem_bytes=sim_pairs.MEM_BYTES):
+        '''For each of texts (not necessarily among self.texts), the top_k (index, similarity) pairs.'''
+        vectors = self.embed(texts)
+        if approximate:
+            return self.lsh_index().query(vectors, top_k)
+        nearests = []
+        step = sim_pairs.block_size(len(texts), len(self.texts), mem_bytes, self.matrix.dtype.itemsize)
+        for beg in range(0, len(texts), step):
+            sims = vectors[beg:beg + step] @ self.matrix.T
+            kth = min(top_k, sims.shape[1]) - 1
+            part = np.argpartition(-sims, kth, axis=1)[:, :kth + 1]
+            for row_part, row_sims in zip(part, sims):
+                row_part = row_part[np.argsort(-row_sims[row_part], kind='stable')]
+                nearests.append([(int(idx), float(row_sims[idx])) for idx in row_part])
+        return nearests
+
 def show_nearest_neighbors(word2vec, vocab, texts, verbose=True):
     '''show closes text pair'''
-    nearest_indexes = nearest_neighbors(word2vec, vocab, texts, verbose)
+    nearest_indexes = SentenceMatrix(word2vec, vocab, texts).nearest_neighbors()
     for idx, txt in enumerate(texts):
         nearest_idx = nearest_indexes[idx]
         nearest_txt = texts[nearest_idx]
@@ -304,8 +379,8 @@ def smoke_test(word2vec, vocab):
     test_word_algebra(word2vec)
 
 def main():
-    '''test driver calls smoke_test'''
-    word2vec = default_word2vec_model(verbose=True)
+    '''test driver calls smoke_test, which uses gensim methods such as most_similar'''
+    word2vec = default_word2vec_model(verbose=True, use_mmap=False)
     vocab = word2vec_vocab(word2vec, verbose=True)
     smoke_test(word2vec, vocab)
 
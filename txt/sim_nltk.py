@@ -8,11 +8,17 @@ import time
 import cProfile
 import pstats
 import io
+import multiprocessing
+import multiprocessing.util
 # import pdb
 import nltk
+import numpy as np
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 import qa_csv
+import sim_pairs
 import text_fio
+import token_cache
 
 STEMMER = nltk.stem.porter.PorterStemmer()
 TRANS_NO_PUNCT = str.maketrans('', '', string.punctuation)
@@ -26,10 +32,19 @@ def stem_tokens(tokens, stemmer=STEMMER):
     '''list of stems, one per input tokens'''
     return [stemmer.stem(item) for item in tokens]
 
-def normalize(text, translation=TRANS_NO_PUNCT):
+def normalize_uncached(text, translation=TRANS_NO_PUNCT):
     '''remove punctuation, lowercase, stem'''
     return stem_tokens(nltk.word_tokenize(text.translate(translation).lower()))
 
+# Shared by all the vectorizers below, since they all tokenize with normalize.
+TOKEN_CACHE = token_cache.TokenCache(max_size=200000, name='sim_nltk.normalize')
+
+def normalize(text, translation=TRANS_NO_PUNCT):
+    '''remove punctuation, lowercase, stem; memoized in TOKEN_CACHE for the default translation'''
+    if translation is not TRANS_NO_PUNCT:
+        return normalize_uncached(text, translation)
+    return TOKEN_CACHE.get(text, normalize_uncached)
+
 VECTORIZER = TfidfVectorizer(tokenizer=normalize, stop_words='english')
 VECT_NO_STOPS = TfidfVectorizer(tokenizer=normalize)
 VECT_MOST_STOPS = TfidfVectorizer(tokenizer=normalize, stop_words=MOST_STOPS)
@@ -237,10 +252,14 @@ def list_nearest_other_idx(texts, similarity_func=cosine_sim_txt):
         nearests[idx] = 1 + idx + max_idx_1 if max_sim_1 > max_sim_0 else max_idx_0
     return nearests
 
+def list_nearest_other_idx_blocked(texts, vectorizer=VECTORIZER, top_k=None, mem_bytes=sim_pairs.MEM_BYTES):
+    '''vectorized list_nearest_other_idx; see sim_pairs.list_nearest_texts'''
+    return sim_pairs.list_nearest_texts(texts, vectorizer, top_k, mem_bytes)
+
 def show_nearest_neighbors(texts, nearest_indexes=None):
     '''print the most similar pairs'''
     if nearest_indexes is None:
-        nearest_indexes = list_nearest_other_idx(texts)
+        nearest_indexes = list_nearest_other_idx_blocked(texts)
     for idx, txt in enumerate(texts):
         nearest_idx = nearest_indexes[idx]
         nearest_txt = texts[nearest_idx]
@@ -299,6 +318,99 @@ def find_nearest_quats(train_quats, trial_quat, q_weight=1.0, sim_func=cosine_si
     return nlargest_items_by_value(sim_dict, max_count)
 
 
+def nlargest_row_items(sims, count=10, min_sim_val=0):
+    '''
+    Returns a list of the (index, value) items for the greatest values >= min_sim_val in the
+    1-D array sims, in descending order by value, ties broken by ascending index, as in
+    nlargest_items_by_value.
+    '''
+    cands = np.flatnonzero(sims >= min_sim_val)
+    if len(cands) > count > 0:
+        part = cands[np.argpartition(-sims[cands], count - 1)[:count]]
+        cands = cands[sims[cands] >= sims[part].min()]      # keep all ties at the k-th value
+    order = np.lexsort((cands, -sims[cands]))[:count]
+    return [(int(idx), float(sims[idx])) for idx in cands[order]]
+
+class QuatIndex:
+    '''
+    TF-IDF index over the questions and answers of train_quats, fit only once.
+    Instead of re-fitting a vectorizer to every pair of texts, as cosine_sim_txt does,
+    the vocabulary and IDF weights come from the whole training set, and each batch of
+    trial quats is scored against all of train_quats by one sparse matrix product.
+    Implements the model interface used by match_quats_to_model.
+    '''
+
+    def __init__(self, train_quats, vectorizer=VECTORIZER, batch_size=256):
+        self.train_quats = train_quats
+        self.batch_size = batch_size
+        self.vectorizer = clone(vectorizer)
+        ntrain = len(train_quats)
+        tfidf = self.vectorizer.fit_transform([quat.question for quat in train_quats] +
+                                              [quat.answer or '' for quat in train_quats])
+        self.qst_mat = tfidf[:ntrain].T.tocsr()
+        self.ans_mat = tfidf[ntrain:].T.tocsr()
+        self.has_ans = np.array([bool(quat.answer) for quat in train_quats])
+        self._index_of_obj = {id(quat): idx for idx, quat in enumerate(train_quats)}
+        self._index_of_id = {quat.id: idx for idx, quat in enumerate(train_quats)}
+
+    def similarity_matrix(self, trial_quats, q_weight=1.0):
+        '''
+        Returns the dense array of weighted Q & A similarities, one row per trial quat and
+        one column per train quat, clipped as in similarity_dict.  A trial quat that is
+        itself in train_quats gets -inf as its similarity to itself.
+        '''
+        assert q_weight > 0.0 and q_weight <= 1.0
+        sims = (self.vectorizer.transform([quat.question for quat in trial_quats])
+                * self.qst_mat).toarray()
+        if q_weight < 1.0:
+            a_sims = (self.vectorizer.transform([quat.answer or '' for quat in trial_quats])
+                      * self.ans_mat).toarray()
+            both = np.outer([bool(quat.answer) for quat in trial_quats], self.has_ans)
+            sims = np.where(both, (sims - a_sims) * q_weight + a_sims, sims)
+        # vectorized prob_clip
+        sims[sims < 0.000001] = 0
+        sims[(sims > 0.99999) & (sims != 1)] = 0.99999
+        for row, quat in enumerate(trial_quats):
+            col = self._index_of_obj.get(id(quat))
+            if col is not None and self.train_quats[col] is quat:
+                sims[row, col] = -np.inf
+        return sims
+
+    def find_nearest_quats(self, trial_quats, q_weight=1.0, max_count=5, min_sim_val=0):
+        '''
+        For each quat in trial_quats, returns a list of (index, similarity) pairs for the
+        most similar train_quats, in descending order of similarity, as find_nearest_quats
+        does for one trial quat.  Returns list of lists: [[(index, similarity), ...], ...]
+        '''
+        nearests = []
+        for beg in range(0, len(trial_quats), self.batch_size):
+            sims = self.similarity_matrix(trial_quats[beg:beg + self.batch_size], q_weight)
+            nearests.extend(nlargest_row_items(row, max_count, min_sim_val) for row in sims)
+        return nearests
+
+    def find_nearest_qas(self, train_quats, trial_quat, q_weight=1.0, sim_func=None,
+                         max_count=5, min_sim_val=0):
+        '''Drop-in replacement for find_nearest_quats in find_nearest_qas_lists; ignores sim_func.'''
+        assert train_quats is self.train_quats
+        return self.find_nearest_quats([trial_quat], q_weight, max_count, min_sim_val)[0]
+
+    def rank_qa_lists(self, trial_quats, q_weight=1.0, max_count=6, min_sim_val=0):
+        '''model interface for match_quats_to_model'''
+        return self.find_nearest_quats(trial_quats, q_weight, max_count, min_sim_val)
+
+    def get_dev_quat_by_index(self, index):
+        '''model interface: train quat at index'''
+        return self.train_quats[index]
+
+    def get_dev_quat_by_id(self, idn):
+        '''model interface: train quat with id == idn'''
+        return self.train_quats[self._index_of_id[idn]]
+
+    def get_all_quats(self):
+        '''model interface: all train quats, in index order'''
+        return self.train_quats
+
+
 def time_str(seconds):
     '''
     Convert seconds (as a float) to a single decimal number and unit of time label.
@@ -329,13 +441,14 @@ def show_progress(train_quats, trial_quats, nearests, idx, beg_time):
 
 def find_nearest_qas_lists(train_quats, trial_quats, find_nearest_qas, sim_func,
                            q_weight=1.0, max_count=5, min_sim_val=0.0, id_eq_index=False,
-                           verbose=True):
+                           verbose=True, on_result=None):
     '''
     For each question-and-answer tuple in trial_quats, find a list of indexes of the most similar
     Q and A's in train_quats.
     Returns list of lists of items as in: [[(index, similariy), ...], ...]
         similarity_func:    function returning the similariy between two texts (as in sentences)
         vocab:              the set of all known words
+        on_result:          if not None, called as on_result(idx, nearest_list) for each finished trial
     '''
     assert q_weight >= 0.0
     ntrain, ntrial = len(train_quats), len(trial_quats)
@@ -354,6 +467,8 @@ def find_nearest_qas_lists(train_quats, trial_quats, find_nearest_qas, sim_func,
             nearests[idx] = find_nearest_qas(train_quats, trial_quat, q_weight=q_weight,
                                              max_count=max_count, min_sim_val=min_sim_val,
                                              sim_func=sim_func)
+            if on_result is not None:
+                on_result(idx, nearests[idx])
             if verbose:
                 show_progress(train_quats, trial_quats, nearests, idx, beg_time)
         except KeyboardInterrupt:
@@ -366,32 +481,176 @@ def find_nearest_qas_lists(train_quats, trial_quats, find_nearest_qas, sim_func,
             prv_time = int_time
     return nearests
 
+# Shared with pool workers: set before forking, or passed once to each worker's initializer.
+_NEAREST_WORKER_ARGS = None
+
+def _init_nearest_worker(worker_args=None):
+    '''Pool worker initializer: keep the shared args and reconnect to any on-disk token cache.'''
+    global _NEAREST_WORKER_ARGS
+    if worker_args is not None:
+        _NEAREST_WORKER_ARGS = worker_args
+    TOKEN_CACHE.reopen()
+    multiprocessing.util.Finalize(None, TOKEN_CACHE.close, exitpriority=10)
+
+def _find_nearest_qas_range(beg_end):
+    '''Pool worker task: nearest lists for trial_quats[beg:end]'''
+    train_quats, trial_quats, find_nearest_qas, kwargs = _NEAREST_WORKER_ARGS
+    return [find_nearest_qas(train_quats, trial_quat, **kwargs) for trial_quat in trial_quats[beg_end[0]:beg_end[1]]]
+
+def find_nearest_qas_lists_parallel(train_quats, trial_quats, find_nearest_qas, sim_func,
+                                    q_weight=1.0, max_count=5, min_sim_val=0.0, processes=None,
+                                    chunk_size=8, verbose=True, on_result=None):
+    '''
+    Same as find_nearest_qas_lists, but the trial quats are split into chunks of chunk_size
+    and farmed out to a pool of processes.  Where fork is available, the train and trial quats
+    are inherited by the workers instead of being pickled; otherwise they are sent once per
+    worker, never per task.  Tasks are just index ranges, so a trial quat that is also in
+    train_quats is still recognized as itself.  Results stream back in order, so progress
+    is shown as in the serial version, and the output is the same.
+    '''
+    global _NEAREST_WORKER_ARGS
+    assert q_weight >= 0.0
+    ntrain, ntrial = len(train_quats), len(trial_quats)
+    worker_args = (train_quats, trial_quats, find_nearest_qas,
+                   dict(q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val, sim_func=sim_func))
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        _NEAREST_WORKER_ARGS, initargs = worker_args, ()
+    else:
+        context = multiprocessing.get_context()
+        initargs = (worker_args,)
+    TOKEN_CACHE.flush()
+    ranges = [(beg, min(beg + chunk_size, ntrial)) for beg in range(0, ntrial, chunk_size)]
+    nearests = ntrial*[None]
+    beg_time = time.time()
+    pool = context.Pool(processes, initializer=_init_nearest_worker, initargs=initargs)
+    try:
+        for (beg, end), chunk in zip(ranges, pool.imap(_find_nearest_qas_range, ranges)):
+            nearests[beg:end] = chunk
+            for idx in range(beg, end):
+                if on_result is not None:
+                    on_result(idx, nearests[idx])
+                if verbose:
+                    show_progress(train_quats, trial_quats, nearests, idx, beg_time)
+        pool.close()
+    except KeyboardInterrupt:
+        print("KeyboardInterrupt in find_nearest_qas_lists_parallel on %d trials, %d train_quats after %d seconds."
+              % (ntrial, ntrain, time.time() - beg_time))
+        pool.terminate()
+    finally:
+        pool.join()
+        _NEAREST_WORKER_ARGS = None
+    return nearests
+
 def find_nearest_qas_lists_self(train_quats, trial_quats, find_nearest_qas,
                                 sim_func=cosine_sim_txt, q_weight=1.0, max_count=5, min_sim_val=0.0):
     '''Find similars including self.'''
     return [find_nearest_qas(train_quats, trial_quat, q_weight, sim_func,
                              max_count, min_sim_val) for trial_quat in trial_quats]
 
+def write_checkpoint_line(out, idx, trial_quat, nearest):
+    '''
+    Append one finished trial to an open checkpoint file as a tab-separated line:
+    trial index, trial id, then one index:similarity field per item of its nearest list.
+    '''
+    fields = ["%d:%r" % (oix, float(sim)) for oix, sim in nearest]
+    out.write("%d\t%d\t%s\n" % (idx, trial_quat.id, "\t".join(fields)))
+    out.flush()
+
+def read_checkpoint(path, trial_quats=None):
+    '''
+    Returns a dict mapping trial indexes to nearest lists as written by write_checkpoint_line,
+    or an empty dict if there is no file at path.  A last line without a newline was cut off
+    by a crash and is ignored.  If trial_quats is given, each saved trial id must match.
+    '''
+    nearests = {}
+    try:
+        with open(path, 'r') as text:
+            for line in text:
+                if not line.endswith('\n'):
+                    break
+                toks = line.rstrip('\n').split('\t')
+                idx, idn = int(toks[0]), int(toks[1])
+                if trial_quats is not None and trial_quats[idx].id != idn:
+                    raise ValueError("checkpoint %s: trial %d has id %d, not %d" % (path, idx, idn,
+                                                                               trial_quats[idx].id))
+                nearests[idx] = [(int(oix), float(sim)) for oix, sim in
+                                 (field.split(':') for field in toks[2:] if field)]
+    except FileNotFoundError:
+        pass
+    return nearests
+
+def merge_checkpoints(paths, trial_quats=None):
+    '''
+    Merge checkpoint files (e.g., one per shard) into one list of nearest lists, one per trial.
+    Trials not found in any of them get an empty list.
+    '''
+    merged = {}
+    for path in paths:
+        merged.update(read_checkpoint(path, trial_quats))
+    ntrial = len(trial_quats) if trial_quats is not None else max(merged, default=-1) + 1
+    return [merged.get(idx, []) for idx in range(ntrial)]
+
+def save_checkpoints_tsv(train_quats, trial_quats, paths, outpath="simlists.tsv", min_sim_val=0,
+                         sort_most_sim=False):
+    '''Merge checkpoint shards and save them as save_most_sim_qa_lists_tsv does.  Returns the lists.'''
+    sim_lists = merge_checkpoints(paths, trial_quats)
+    save_most_sim_qa_lists_tsv(train_quats, trial_quats, sim_lists, outpath=outpath,
+                               min_sim_val=min_sim_val, sort_most_sim=sort_most_sim)
+    return sim_lists
+
 def find_ranked_qa_lists(train_quats, trial_quats, find_nearest_qas, sim_func, q_weight=1.0,
-                         max_count=6, min_sim_val=1.0/6):
+                         max_count=6, min_sim_val=1.0/6, processes=1,
+                         checkpoint_path=None, resume=False, shard=None):
     '''
     Returns list of most similar lists.  For each object in quats, compute the similarity with all
     (other) objects in quats, and save at most max_count indices and similarity measures in descending
     order of similarity, where similiary >= min_sim_val.  If exclude_self is false, compare each object
     with itself as well as the others (sanity check)
+    If processes is not 1, the work is spread over that many processes (None means all CPUs).
+    If checkpoint_path is given, each finished list is appended to that file as soon as it is found;
+    with resume, trials already in that file are read back instead of being recomputed.
+    If shard is (index, count), only trials whose index % count == index are computed; the rest
+    are left None (merge the shards' checkpoints with merge_checkpoints or save_checkpoints_tsv).
     '''
     ranked_lists = None
     beg_time = time.time()
+    done = read_checkpoint(checkpoint_path, trial_quats) if checkpoint_path and resume else {}
+    todo = [idx for idx in range(len(trial_quats))
+            if idx not in done and (shard is None or idx % shard[1] == shard[0])]
+    todo_quats = [trial_quats[idx] for idx in todo]
+    out = None
+    on_result = None
+    if checkpoint_path:
+        out = open(checkpoint_path, 'a+' if resume else 'w')
+        if resume:
+            out.seek(0)
+            text = out.read()
+            out.truncate(text.rfind('\n') + 1)     # drop any line cut off by a crash
+        on_result = lambda sub, nearest: write_checkpoint_line(out, todo[sub], todo_quats[sub], nearest)
+        print("Checkpointing to %s: %d trials already done, %d to do" % (checkpoint_path, len(done), len(todo)))
     # import pdb; pdb.set_trace()
-    ranked_lists = find_nearest_qas_lists(train_quats, trial_quats, find_nearest_qas, sim_func,
-                                          q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val,
-                                          id_eq_index=False)
+    try:
+        if processes == 1:
+            todo_lists = find_nearest_qas_lists(train_quats, todo_quats, find_nearest_qas, sim_func,
+                                                q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val,
+                                                id_eq_index=False, on_result=on_result)
+        else:
+            todo_lists = find_nearest_qas_lists_parallel(train_quats, todo_quats, find_nearest_qas, sim_func,
+                                                         q_weight=q_weight, max_count=max_count,
+                                                         min_sim_val=min_sim_val, processes=processes,
+                                                         on_result=on_result)
+    finally:
+        if out is not None:
+            out.close()
+    ranked_lists = [done.get(idx) for idx in range(len(trial_quats))]
+    for idx, nearest in zip(todo, todo_lists):
+        ranked_lists[idx] = nearest
     seconds = time.time() - beg_time
     print("Finding all similarity lists (train %d, trial %d, nears %d) took %.1f seconds" % \
           (len(train_quats), len(trial_quats), max_count, seconds))
     return ranked_lists
 
-
 def distance_counts(train_quats, trial_quats, sim_lists, max_dist):
     '''
     Returns a list of miss-distance counts: how many missed the gold standard by 0 (exact match),
@@ -523,7 +782,7 @@ def save_most_sim_qa_lists_tsv(train_quats, trial_quats, sim_lists, ntrain=None,
 # TEST: >>> match_tat(fair, sim_func=sim_wosc_nltk.sentence_similarity)
 def match_tat(all_quats, ntrain=None, outpath="simlists.tsv",
               find_nearest_qas=find_nearest_quats, sim_func=None,
-              q_weight=1.0, max_count=6, min_sim_val=0, sort_most_sim=False):
+              q_weight=1.0, max_count=6, min_sim_val=0, sort_most_sim=False, processes=1):
     '''       Match Training And Test Quats.
     Compute similarities between all quats, training and test, score them against
     gold standard, and save the list of similarity lists to TSV for further work.
@@ -534,7 +793,8 @@ def match_tat(all_quats, ntrain=None, outpath="simlists.tsv",
         # import pdb; pdb.set_trace()
         find_nearest_qas = functools.partial(find_nearest_qas, sim_func=sim_func)
     sim_lists = find_ranked_qa_lists(all_quats, all_quats, find_nearest_qas, sim_func,
-                                     q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val)
+                                     q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val,
+                                     processes=processes)
     score = score_most_sim_lists(all_quats, all_quats, sim_lists)
     save_most_sim_qa_lists_tsv(all_quats, all_quats, sim_lists, ntrain=ntrain,
                                outpath=outpath, min_sim_val=min_sim_val, sort_most_sim=sort_most_sim)
@@ -548,8 +808,11 @@ def match_tat(all_quats, ntrain=None, outpath="simlists.tsv",
 # match_tat(size=418, count=6) took 399.6 seconds; score 82.8708
 def moby_tat(quats=None, nproto=200, ntrain=0, inpath="simsilver.tsv", outpath="moby_simlists.txt",
              find_qas=find_nearest_quats, sim_func=None, q_weight=1.0,
-             max_count=6, min_sim_val=0, sort_most_sim=False, reload=False):
-    '''Test match_tat on moby_dick or other specified quats.'''
+             max_count=6, min_sim_val=0, sort_most_sim=False, reload=False, token_cache_path=None):
+    '''Test match_tat on moby_dick or other specified quats.
+    If token_cache_path is given, tokens are read from and saved to that file.'''
+    if token_cache_path:
+        TOKEN_CACHE.open(token_cache_path)
     if quats is None or reload:
         quats = qa_csv.csv_read_qa(inpath)
     if ntrain > 0:
@@ -560,23 +823,28 @@ def moby_tat(quats=None, nproto=200, ntrain=0, inpath="simsilver.tsv", outpath="
                               find_nearest_qas=find_qas, sim_func=sim_func,
                               q_weight=q_weight, max_count=max_count,
                               min_sim_val=min_sim_val, sort_most_sim=sort_most_sim)
+    TOKEN_CACHE.print_stats()
+    TOKEN_CACHE.flush()
     return score, slists, used_quats
 
 ###############################################################################
 def match_ttt(train_quats, trial_quats, outpath="matched_ttt.tsv",
               find_nearest_qas=find_nearest_quats, sim_func=cosine_sim_txt,
-              q_weight=1.0, max_count=6, min_sim_val=0, sort_most_sim=False):
+              q_weight=1.0, max_count=6, min_sim_val=0, sort_most_sim=False, processes=1,
+              checkpoint_path=None, resume=False):
     '''       Match Trial To Training Quats.
     Compute similarities using sim_func, score them against gold standard, and save
     the list of similarity lists to TSV for further work.  Many default values are
-    assumed, and the score is returned, not saved.'''
+    assumed, and the score is returned, not saved.
+    See find_ranked_qa_lists for checkpoint_path and resume.'''
     beg_time = time.time()
     # if sim_func is not None:
     #     # import pdb; pdb.set_trace()
     #     find_nearest_qas = functools.partial(find_nearest_qas, sim_func=sim_func)
     # import pdb; pdb.set_trace()
     sim_lists = find_ranked_qa_lists(train_quats, trial_quats, find_nearest_qas, sim_func,
-                                     q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val)
+                                     q_weight=q_weight, max_count=max_count, min_sim_val=min_sim_val,
+                                     processes=processes, checkpoint_path=checkpoint_path, resume=resume)
     score = score_most_sim_lists(train_quats, trial_quats, sim_lists)
     save_most_sim_qa_lists_tsv(train_quats, trial_quats, sim_lists,
                                outpath=outpath, min_sim_val=min_sim_val, sort_most_sim=sort_most_sim)
@@ -589,8 +857,11 @@ def match_ttt(train_quats, trial_quats, outpath="matched_ttt.tsv",
 def moby_ttt(quats=None, nproto=200, ntrain=0, inpath="simsilver.tsv", outpath="moby_matched.txt",
              find_qas=find_nearest_quats, sim_func=cosine_sim_txt,
              q_weight=1.0, max_count=6, min_sim_val=0, sort_most_sim=False,
-             reload=False, swap=False, profile=False):
-    '''Test match_tat on moby_dick or other specified quats.'''
+             reload=False, swap=False, profile=False, token_cache_path=None):
+    '''Test match_ttt on moby_dick or other specified quats.
+    If token_cache_path is given, tokens are read from and saved to that file.'''
+    if token_cache_path:
+        TOKEN_CACHE.open(token_cache_path)
     if quats is None or reload:
         quats = qa_csv.csv_read_qa(inpath)
     if ntrain > 0:
@@ -615,6 +886,8 @@ def moby_ttt(quats=None, nproto=200, ntrain=0, inpath="simsilver.tsv", outpath="
         pst = pstats.Stats(pro, stream=sio).sort_stats('cumulative')
         pst.print_stats(30)
         print(sio.getvalue())
+    TOKEN_CACHE.print_stats()
+    TOKEN_CACHE.flush()
     return score, ms_lists, train_quats, trial_quats
 
 def mobydef(mquats, ntry=10):
@@ -624,6 +897,7 @@ def mobydef(mquats, ntry=10):
 
 
 # TODO: use kwargs for a bag of parameters.
+# TEST: >>> score, msl = match_quats_to_model(QuatIndex(quats[:200]), quats[200:])
 def match_quats_to_model(model, trial_quats, outpath="matched_qtm.tsv", q_weight=1.0, max_count=6, min_sim_val=0):
     '''Compute similar Q&A's using a model, score them against a gold standard, and save
     the list of best matches to text file for further work.  The model must implement:
@@ -633,7 +907,7 @@ def match_quats_to_model(model, trial_quats, outpath="matched_qtm.tsv", q_weight
         get_all_quats()
     assumed, and the score is returned, not saved.'''
     beg_time = time.time()
-    sim_lists = model.rank_qa_lists(model, trial_quats, q_weight=q_weight, max_count=max_count,
+    sim_lists = model.rank_qa_lists(trial_quats, q_weight=q_weight, max_count=max_count,
                                     min_sim_val=min_sim_val)
     train_quats = model.get_all_quats()
     score = score_most_sim_lists(train_quats, trial_quats, sim_lists)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+'''
+All-pairs nearest neighbors over a document-term matrix, computed in row blocks.
+Each block of rows is multiplied against the whole matrix at once, so the similarity
+function is never called per pair, and blocks are sized so that the similarities of
+one block fit within a memory budget, counting the sparse product they are made from.
+Rows are assumed to be L2-normalized (as TfidfVectorizer makes them by default), so the
+dot product is the cosine similarity.
+'''
+
+import numpy as np
+import scipy.sparse
+from sklearn.base import clone
+
+MEM_BYTES = 256 * 1024 * 1024       # budget for one block of similarities
+INDEX_BYTES = 8                     # bytes per column index of a scipy.sparse product, at most
+
+def block_size(nrows, ncols, mem_bytes=MEM_BYTES, itemsize=4):
+    '''number of rows of an nrows x ncols array of itemsize-byte floats that fit in mem_bytes'''
+    return max(1, min(nrows, mem_bytes // max(1, ncols * itemsize)))
+
+def doc_term_matrix(texts, vectorizer, dtype=np.float32):
+    '''fit a copy of vectorizer to texts and return their (sparse) document-term matrix'''
+    return clone(vectorizer).fit_transform(texts).astype(dtype)
+
+def nearest_other_blocks(doc_mat, top_k=1, mem_bytes=MEM_BYTES):
+    '''
+    Yield (beg, idxs, sims) for consecutive blocks of rows of doc_mat, where idxs[row] holds
+    the indexes of the top_k most similar other rows to row beg + row, in descending order of
+    similarity, and sims[row] holds those similarities.
+    A row never counts as its own neighbor; if it has fewer than top_k others, the missing
+    places get index -1 and similarity -inf.
+    The product of a sparse block and doc_mat.T is sparse but can be nearly dense, so a
+    block is sized for both that product, with a column index per value, and its dense copy.
+    '''
+    nrows = doc_mat.shape[0]
+    doc_tr = doc_mat.T
+    itemsize = doc_mat.dtype.itemsize
+    if scipy.sparse.issparse(doc_mat):
+        itemsize = 2 * itemsize + INDEX_BYTES
+    step = block_size(nrows, nrows, mem_bytes, itemsize)
+    for beg in range(0, nrows, step):
+        end = min(beg + step, nrows)
+        sims = doc_mat[beg:end] @ doc_tr
+        sims = sims.toarray() if hasattr(sims, 'toarray') else np.array(sims)
+        rows = np.arange(end - beg)
+        sims[rows, rows + beg] = -np.inf
+        if top_k == 1:
+            idxs = sims.argmax(axis=1)[:, None]
+        else:
+            kth = min(top_k, nrows) - 1
+            part = np.argpartition(-sims, kth, axis=1)[:, :kth + 1]
+            part_sims = np.take_along_axis(sims, part, axis=1)
+            order = np.lexsort((part, -part_sims), axis=1)
+            idxs = np.take_along_axis(part, order, axis=1)
+        top_sims = np.take_along_axis(sims, idxs, axis=1)
+        idxs[top_sims == -np.inf] = -1
+        yield beg, idxs, top_sims
+
+def list_nearest_other_idx(doc_mat, top_k=None, mem_bytes=MEM_BYTES):
+    '''
+    For each row of doc_mat, find the index of the most similar other row, as in
+    sim_nltk.list_nearest_other_idx.  Returns the list of indexes, or, if top_k is given,
+    the list of lists of the top_k (index, similarity) pairs.
+    '''
+    nearests = []
+    for _, idxs, sims in nearest_other_blocks(doc_mat, top_k or 1, mem_bytes):
+        if top_k is None:
+            nearests.extend(int(idx) for idx in idxs[:, 0])
+        else:
+            for row_idxs, row_sims in zip(idxs, sims):
+                nearests.append([(int(idx), float(sim)) for idx, sim in zip(row_idxs, row_sims)
+                                 if idx >= 0])
+    return nearests
+
+def list_nearest_texts(texts, vectorizer, top_k=None, mem_bytes=MEM_BYTES):
+    '''
+    Vectorized list_nearest_other_idx for texts: builds one document-term matrix for all
+    texts and computes their cosine similarities in row blocks of at most mem_bytes, instead
+    of calling a similarity function on every pair.  Returns the list of nearest indexes, or, if top_k
+    is given, the list of lists of the top_k (index, similarity) pairs.
+    Note that the IDF weights come from all texts, not from each pair as in the
+    cosine_sim_txt functions of sim_nltk.py and sim_tfidf_nltk.py.
+    '''
+    return list_nearest_other_idx(doc_term_matrix(texts, vectorizer), top_k, mem_bytes)
+
+class RandomProjectionIndex:
+    '''
+    Approximate nearest neighbors among the L2-normalized rows of a dense matrix, by
+    random-projection LSH: each of ntables hashes a row to the signs of its projections on
+    nbits random hyperplanes, so rows at small angles tend to share buckets.  Queries are
+    compared exactly only with the rows in their buckets.  By default nbits is chosen to
+    average about 32 rows per bucket; more tables raise recall at the cost of query time.
+    '''
+
+    def __init__(self, matrix, nbits=None, ntables=16, seed=0):
+        rng = np.random.default_rng(seed)
+        if nbits is None:
+            nbits = max(1, int(round(np.log2(max(2, matrix.shape[0])))) - 5)
+        self.matrix = matrix
+        self.planes = rng.standard_normal((ntables, matrix.shape[1], nbits)).astype(matrix.dtype)
+        self.weights = 1 << np.arange(nbits, dtype=np.int64)
+        self.tables = []
+        for table in range(ntables):
+            codes = self.codes(matrix, table)
+            order = np.argsort(codes, kind='stable')
+            keys, starts = np.unique(codes[order], return_index=True)
+            self.tables.append((keys, np.append(starts, len(order)), order))
+
+    def codes(self, vectors, table):
+        '''integer bucket keys of the rows of vectors in one hash table'''
+        return ((vectors @ self.planes[table]) > 0).astype(np.int64) @ self.weights
+
+    def candidates(self, vectors):
+        '''list of arrays of the indexes of rows sharing a bucket with each of vectors in any table'''
+        buckets = [[] for _ in range(len(vectors))]
+        for table, (keys, starts, order) in enumerate(self.tables):
+            if not len(keys):
+                continue            # no rows indexed, so no candidates
+            codes = self.codes(vectors, table)
+            found = np.minimum(np.searchsorted(keys, codes), len(keys) - 1)
+            for row in np.flatnonzero(keys[found] == codes):
+                buckets[row].append(order[starts[found[row]]:starts[found[row] + 1]])
+        return [np.unique(np.concatenate(bucket)) if bucket else np.zeros(0, dtype=np.int64)
+                for bucket in buckets]
+
+    def query(self, vectors, top_k=1, exclude=None):
+        '''
+        For each row of vectors, the list of up to top_k (index, similarity) pairs for the most
+        similar candidate rows, in descending order of similarity.  If exclude is given,
+        exclude[row] is an index to leave out (e.g., the query row itself).
+        '''
+        nearests = []
+        for row, cands in enumerate(self.candidates(vectors)):
+            if exclude is not None:
+                cands = cands[cands != exclude[row]]
+            sims = self.matrix[cands] @ vectors[row]
+            order = np.argsort(-sims, kind='stable')[:top_k]
+            nearests.append([(int(cands[idx]), float(sims[idx])) for idx in order])
+        return nearests
+
+    def list_nearest_other_idx(self, top_k=None, batch_size=1024):
+        '''
+        Approximate list_nearest_other_idx over the indexed rows: the index of the most similar
+        other row found (-1 if none), or, if top_k is given, lists of (index, similarity) pairs.
+        '''
+        nearests = []
+        for beg in range(0, self.matrix.shape[0], batch_size):
+            batch = self.matrix[beg:beg + batch_size]
+            found = self.query(batch, top_k or 1, exclude=np.arange(beg, beg + len(batch)))
+            if top_k is None:
+                nearests.extend(near[0][0] if near else -1 for near in found)
+            else:
+                nearests.extend(found)
+        return nearests
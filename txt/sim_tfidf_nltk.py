@@ -8,6 +8,7 @@ import nltk
 from sklearn.feature_extraction.text import TfidfVectorizer
 import pdb
 import qa_csv
+import sim_pairs
 import text_fio
 
 STEMMER = nltk.stem.porter.PorterStemmer()
@@ -179,10 +180,14 @@ def list_nearest_other_idx(texts, similarity_func=cosine_sim_txt):
         nearests[idx] = 1 + idx + max_idx_1 if max_sim_1 > max_sim_0 else max_idx_0
     return nearests
 
+def list_nearest_other_idx_blocked(texts, vectorizer=VECTORIZER, top_k=None, mem_bytes=sim_pairs.MEM_BYTES):
+    '''vectorized list_nearest_other_idx; see sim_pairs.list_nearest_texts'''
+    return sim_pairs.list_nearest_texts(texts, vectorizer, top_k, mem_bytes)
+
 def show_nearest_neighbors(texts, nearest_indexes=None):
     '''print the most similar pairs'''
     if nearest_indexes is None:
-        nearest_indexes = list_nearest_other_idx(texts)
+        nearest_indexes = list_nearest_other_idx_blocked(texts)
     for idx, txt in enumerate(texts):
         nearest_idx = nearest_indexes[idx]
         nearest_txt = texts[nearest_idx]
@@ -35,6 +35,7 @@ import numpy as np
 import word_sim
 import sim_nltk
 import text_regex
+import word_freqs
 
 
 NTags = namedtuple("NTags", "idx pos wnt")
@@ -54,39 +55,42 @@ def pos_wnk(tag):
 class SentSimilarity:
     '''Sentence similarity using NLTK WordNet Synsets and word order.'''
 
-    def __init__(self, wordsim, use_propers=True, verbose=False):
+    def __init__(self, wordsim, use_propers=True, verbose=False, word_freqs_path=word_freqs.WORD_FREQS_PATH):
         '''Initialize internals'''
         self.wordsim = wordsim
         self.verbose = verbose
-        self._brown_freq_count = 0
-        self._brown_freqs = dict()
+        self._word_freqs_path = word_freqs_path
+        self._word_freqs = None
         self._delta = 0.8
         self._min_word_sim_semantic = 0.2   # formerly known as PHI
         self._min_word_sim_order = 0.4      # formerly known as ETA
         self._use_propers = use_propers
 
 
+    def load_word_freqs(self):
+        """
+        Load the prebuilt word frequency table at self._word_freqs_path (see word_freqs.py),
+        or, if there is none, count the words in the Brown corpus (slow).
+        """
+        beg_time = time.time()
+        try:
+            self._word_freqs = word_freqs.WordFreqTable.load(self._word_freqs_path)
+        except FileNotFoundError:
+            self._word_freqs = word_freqs.WordFreqTable.from_counts(word_freqs.count_words(brown.sents()))
+            print("self.info_content: No table at %s; build one with word_freqs.py" % self._word_freqs_path)
+        print("self.info_content: Initializing Brown Freqs took %.3f seconds" % (time.time() - beg_time))
+
     def info_content(self, lookup_word):
         """
         Uses the Brown corpus available in NLTK to calculate a Laplace
         smoothed frequency distribution of words, then uses this information
         to compute the information content of the lookup_word.
-        TODO: Optimize -- call once.
+        The counts are loaded once, from a prebuilt table if possible.
         """
-        if self._brown_freq_count == 0:
-            beg_time = time.time()
-            # poor man's lazy evaluation
-            for sent in brown.sents():
-                for word in sent:
-                    word = word.lower()
-                    if not word in self._brown_freqs:
-                        self._brown_freqs[word] = 0
-                    self._brown_freqs[word] = self._brown_freqs[word] + 1
-                    self._brown_freq_count = self._brown_freq_count + 1
-            print("self.info_content: Initializing Brown Freqs took %d seconds" % (time.time() - beg_time))
-        lookup_word = lookup_word.lower()
-        count = 0 if not lookup_word in self._brown_freqs else self._brown_freqs[lookup_word]
-        return 1.0 - (math.log(count + 1) / math.log(self._brown_freq_count + 1))
+        if self._word_freqs is None:
+            self.load_word_freqs()
+        count = self._word_freqs.count(lookup_word.lower())
+        return 1.0 - (math.log(count + 1) / math.log(self._word_freqs.total + 1))
 
 
     ######################### word order similarity ##########################
@@ -102,26 +106,7 @@ class SentSimilarity:
         position of the most similar word in the sentence as long as the similarity
         is above the threshold self._min_word_sim_order.
         """
-        vec_len = len(joint_word_set)
-        sem_vec = np.zeros(vec_len)
-        ord_vec = np.zeros(vec_len)
-        for idx, joint_word in enumerate(joint_word_set):
-            try:
-                # word in joint_word_set found in sentence, just populate the index
-                ord_vec[idx] = sent_word_dct[joint_word]
-                sem_vec[idx] = 1.0
-                if use_content_norm:
-                    info_cont = self.info_content(joint_word)
-                    sem_vec[idx] *= info_cont * info_cont
-            except KeyError:
-                # word not in joint_word_set, find most similar word and populate
-                # word_vector with the thresholded similarity
-                sim_word, max_sim = self.wordsim.most_similar_word(sent_word_dct.keys(), joint_word)
-                ord_vec[idx] = sent_word_dct[sim_word] if max_sim > self._min_word_sim_order else 0
-                sem_vec[idx] = max_sim if max_sim > self._min_word_sim_semantic else 0.0
-                if use_content_norm:
-                    sem_vec[idx] = sem_vec[idx] * self.info_content(joint_word) * self.info_content(sim_word)
-        return sem_vec, ord_vec
+        return self.sem_and_wo_vectors_batch(sent_word_dct, list(joint_word_set), use_content_norm)
 
     ######################### semantic similarity ##########################
 
@@ -168,41 +153,56 @@ class SentSimilarity:
         position of the most similar word in the sentence as long as the similarity
         is above the threshold self._min_word_sim_order.
         """
-        vec_len = len(joint_wordpos_dct)
-        sem_vec = np.zeros(vec_len)
-        ord_vec = np.zeros(vec_len)
-        # print("PT:", end=' ')
-        for idx, joint_word in enumerate(joint_wordpos_dct):
-            # print(joint_word, end=' ')
-            if joint_word in sent_word_dct.keys():
-                sem_vec[idx] = 1.0
-                ord_vec[idx] = sent_word_dct[joint_word][0] if use_pos else sent_word_dct[joint_word]
-                if use_content_norm:
-                    info_cont = self.info_content(joint_word)
-                    sem_vec[idx] *= info_cont * info_cont
+        joint_words = list(joint_wordpos_dct)
+        if use_pos:
+            return self.sem_and_wo_vectors_batch(sent_word_dct, joint_words, use_content_norm,
+                                                 [joint_wordpos_dct[word] for word in joint_words])
+        return self.sem_and_wo_vectors_batch(sent_word_dct, joint_words, use_content_norm)
+
+    def sem_and_wo_vectors_batch(self, sent_word_dct, joint_words, use_content_norm=False,
+                                 joint_ntags=None):
+        """
+        Batched computation of the semantic and word order vectors described above.
+        Instead of calling most_similar_word(_pos) once per joint word not in the sentence,
+        this gets the whole (missing joint word) x (sentence word) similarity matrix in one
+        pass through the word similarity cache, then takes the row-wise max and argmax and
+        applies the thresholds as masks.  If joint_ntags (NTags per joint word) is given, the
+        values of sent_word_dct are NTags too, and words are compared by POS as in
+        most_similar_word_pos; otherwise they are word indexes.
+        """
+        use_pos = joint_ntags is not None
+        word_idxs = {word: val[0] if use_pos else val for word, val in sent_word_dct.items()}
+        sent_words = list(word_idxs)
+        sent_idxs = np.array(list(word_idxs.values()), dtype=float)
+        in_sent = np.array([word in word_idxs for word in joint_words], dtype=bool)
+        missing = np.flatnonzero(~in_sent)
+        miss_words = [joint_words[idx] for idx in missing]
+
+        sem_vec = in_sent.astype(float)
+        ord_vec = np.zeros(len(joint_words))
+        ord_vec[in_sent] = [word_idxs[word] for word in joint_words if word in word_idxs]
+
+        if sent_words and miss_words:
+            if use_pos:
+                sims = self.wordsim.word_similarity_matrix_pos(miss_words, [joint_ntags[idx] for idx in missing],
+                                                               sent_word_dct, self._use_propers)
             else:
-                # word not in joint_wordpos_set, find most similar word and populate
-                # word_vector with the thresholded similarity
-                if use_pos:
-                    joint_ntags = joint_wordpos_dct[joint_word]
-                    sim_word, max_sim = self.wordsim.most_similar_word_pos(sent_word_dct, joint_word,
-                                                                           joint_ntags, self._use_propers)
-                else:
-                    sim_word, max_sim = self.wordsim.most_similar_word(sent_word_dct.keys(), joint_word)
-
-                if max_sim > self._min_word_sim_order:
-                    ord_vec[idx] = sent_word_dct[sim_word][0] if use_pos else sent_word_dct[sim_word]
-                else:
-                    ord_vec[idx] = 0
-
-                sem_vec[idx] = max_sim if max_sim > self._min_word_sim_semantic else 0.0
-
-                if use_content_norm:
-                    sem_vec[idx] = sem_vec[idx] * self.info_content(joint_word) * self.info_content(sim_word)
-        # print()
-        # print("PT:", sem_vec)
-        # print(ord_vec)
-        # print()
+                sims = self.wordsim.word_similarity_matrix(miss_words, sent_words)
+            sim_idxs = sims.argmax(axis=1)      # first of equal maxima, as in most_similar_word
+            max_sims = np.maximum(sims[np.arange(len(miss_words)), sim_idxs], 0.0)
+        else:
+            sim_idxs = np.zeros(len(miss_words), dtype=int)
+            max_sims = np.zeros(len(miss_words))
+        if sent_words:
+            ord_vec[missing] = np.where(max_sims > self._min_word_sim_order, sent_idxs[sim_idxs], 0)
+        sem_vec[missing] = np.where(max_sims > self._min_word_sim_semantic, max_sims, 0.0)
+
+        if use_content_norm:
+            info_conts = np.array([self.info_content(word) for word in joint_words])
+            sem_vec[in_sent] *= info_conts[in_sent] ** 2
+            sim_info_conts = np.array([self.info_content(sent_words[idx]) if sim > 0 else 1.0
+                                       for idx, sim in zip(sim_idxs, max_sims)])
+            sem_vec[missing] *= info_conts[missing] * sim_info_conts
         return sem_vec, ord_vec
 
 ######################### vector cosine similarities ##########################
@@ -377,7 +377,7 @@ def test_sentence_similarity(sentsim):
 
 def smoke_test():
     '''test very basic functionality'''
-    wordsim = word_sim.WordSimilarity(verbose=True)
+    wordsim = word_sim.WordNetSimilarity(verbose=True)
     sentsim = SentSimilarity(wordsim, verbose=True)
     word_sim.test_word_similarity(wordsim)
     test_sentence_similarity(sentsim)
@@ -408,7 +408,7 @@ match_ttt(n_train=40, n_trial=40, count=6) took 4137.7 seconds; score 78.5422
      3200    0.075    0.000 1645.103    0.514 /Users/sprax/asdf/spryt/txt/sim_wosc_nltk.py:290(semantic_vector)
     '''
     out_path = "moby_ttt_pos.txt" if pos else "moby_ttt_slo.txt"
-    wordsim = word_sim.WordSimilarity()
+    wordsim = word_sim.WordNetSimilarity()
     sentsim = SentSimilarity(wordsim)
     if pos:
         if tok:
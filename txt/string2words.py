@@ -2,12 +2,47 @@
 '''
 Parse a string into words
 Usage: python string2words.py words.txt rainrajatacozapsrakezarfabetrainzany
+The recursive string2words_* functions re-parse shared suffixes; string2words_best,
+parse_dag, and all_parses parse each suffix once, over a trie of the dictionary,
+so they handle unspaced strings of many thousands of chars.
+An empty string has no parse, for all of these functions.
+PalindromeFinder generates palindromes of two or more dictionary words from a trie
+of the reversed words; see bench_palindromes.py for timings against the older finders.
+Run the examples below with:  python -m doctest string2words.py
+
+    >>> load_dictionary(WORDS_PATH)     # doctest: +ELLIPSIS
+    Read  173528  words from dictionary file: ...
+    >>> count_parses(parse_dag('atone')), sorted(all_parses('atone'))
+    (2, ['at one', 'atone'])
+    >>> string2words_best('garbageatone'), string2words_from_end_one('garbageatone', '')
+    ('garbage atone', 'garbage at one')
+    >>> old_parses = []
+    >>> string2words_from_beg_all('minimumergold', '', old_parses)
+    >>> sorted(old_parses) == sorted(all_parses('minimumergold')), len(old_parses)
+    (True, 8)
+
+Ten thousand chars parse in well under a second, even where the recursive functions
+would have to try an astronomical number of parses:
+
+    >>> dag = parse_dag('minimumergold' * 800)
+    >>> count_parses(dag) == 8 ** 800
+    True
+    >>> string2words_best('minimumergold' * 800, dag=dag) == ' '.join(['minimum erg old'] * 800)
+    True
+    >>> string2words_best('a' * 10000) == ' '.join(['aa'] * 5000)
+    True
+    >>> count_parses(parse_dag('')), list(all_parses('')), string2words_best('')
+    (0, [], None)
 '''
 
 
 import argparse
 from collections import Counter
 from collections import defaultdict
+import gc
+import itertools
+import math
+import os.path
 import pdb
 from pdb import set_trace
 import sys
@@ -16,6 +51,8 @@ VERBOSE = 1
 MIN_WORD_LEN = 2
 MAX_WORD_LEN = 24
 DICTIONARY = {}
+DICTIONARY_TRIE = {}
+WORDS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'words.txt')
 
 def string2words_from_end_one(string, words_already_parsed):
     '''
@@ -88,6 +125,144 @@ def string2words_from_beg_all(string, words_already_parsed, all_parses):
     # No return value; any results were appended to all_parses.
 
 
+def build_trie(words):
+    '''
+    Returns a trie of words as nested dicts, one level per char, in which the
+    node at the end of each word maps None to the word.
+    '''
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[None] = word
+    return trie
+
+def dictionary_trie():
+    '''trie of DICTIONARY, built on first use (after load_dictionary)'''
+    if not DICTIONARY_TRIE:
+        DICTIONARY_TRIE.update(build_trie(DICTIONARY))
+    return DICTIONARY_TRIE
+
+def word_ends(string, beg, trie, min_len=MIN_WORD_LEN, max_len=MAX_WORD_LEN):
+    '''indices end such that string[beg:end] is a word in trie, in increasing order'''
+    ends = []
+    node = trie
+    for end in range(beg, min(len(string), beg + max_len)):
+        node = node.get(string[end])
+        if node is None:
+            break
+        if None in node and end + 1 - beg >= min_len:
+            ends.append(end + 1)
+    return ends
+
+def parse_dag(string, trie=None, min_len=MIN_WORD_LEN, max_len=MAX_WORD_LEN):
+    '''
+    Returns the DAG of all parses of string into words: a list that maps each index
+    beg to the list of ends such that string[beg:end] is a word AND string[end:] parses
+    (index len(string) > 0 maps to [len(string)]).  An empty list at 0 means no parse,
+    as for the empty string.  Each suffix is parsed once, so this is linear in
+    len(string) times max_len.
+    '''
+    trie = trie if trie is not None else dictionary_trie()
+    size = len(string)
+    dag = [[] for _ in range(size + 1)]
+    if size:
+        dag[size].append(size)
+    for beg in range(size - 1, -1, -1):
+        dag[beg] = [end for end in word_ends(string, beg, trie, min_len, max_len) if dag[end]]
+    return dag
+
+def count_parses(dag):
+    '''number of parses in a DAG from parse_dag (0 for the empty string)'''
+    size = len(dag) - 1
+    if not dag[0]:
+        return 0
+    counts = [0] * (size + 1)
+    counts[size] = 1
+    for beg in range(size - 1, -1, -1):
+        counts[beg] = sum(counts[end] for end in dag[beg])
+    return counts[0]
+
+def all_parses(string, dag=None):
+    '''
+    Lazily generate every parse of string into words, as strings with spaces
+    inserted between the words, by depth-first search of the parse DAG.
+    The DAG shares each suffix's sub-parses, so the generator does no work for
+    parses that are never taken, and no recursion, however long the string.
+    '''
+    dag = dag if dag is not None else parse_dag(string)
+    size = len(string)
+    if not dag[0]:
+        return
+    words = []
+    stack = [(0, iter(dag[0]))]
+    while stack:
+        beg, ends = stack[-1]
+        end = next(ends, None)
+        if end is None:
+            stack.pop()
+            if words:
+                words.pop()
+            continue
+        words.append(string[beg:end])
+        if end == size:
+            yield ' '.join(words)
+            words.pop()
+        else:
+            stack.append((end, iter(dag[end])))
+
+class UnigramModel:
+    '''
+    Log probabilities of dictionary words from their counts in a corpus, with add-alpha
+    smoothing so words missing from the corpus are unlikely but possible.  With no counts,
+    every word is equally likely, and the best parse is the one with the fewest words.
+    word_count can be a dict's get or word_freqs.WordFreqTable(...).count.
+    '''
+    def __init__(self, word_count=None, total=0, vocab_size=0, alpha=0.5):
+        self.word_count = word_count
+        self.alpha = alpha
+        self.log_denom = math.log(total + alpha * max(vocab_size, 1))
+        self.uniform = -math.log(max(vocab_size, 1))
+        self.memo = {}
+
+    def log_prob(self, word):
+        '''log probability of word'''
+        if self.word_count is None:
+            return self.uniform
+        prob = self.memo.get(word)
+        if prob is None:
+            prob = math.log(self.word_count(word) + self.alpha) - self.log_denom
+            self.memo[word] = prob
+        return prob
+
+def string2words_best(string, model=None, dag=None):
+    '''
+    Divide a string into its most probable sequence of words under a unigram model
+    (default: every dictionary word equally likely), by dynamic programming over the
+    parse DAG from the end: best[beg] is the best log probability of string[beg:].
+    Ties go to the longer first word.  Returns a string with spaces inserted between
+    the words, or None if the parse fails.
+    '''
+    dag = dag if dag is not None else parse_dag(string)
+    model = model if model is not None else UnigramModel(vocab_size=len(DICTIONARY))
+    size = len(string)
+    if not dag[0]:
+        return None
+    best = [0.0] * (size + 1)
+    best_end = [size] * (size + 1)
+    for beg in range(size - 1, -1, -1):
+        if dag[beg]:
+            best[beg], best_end[beg] = max((model.log_prob(string[beg:end]) + best[end], end)
+                                           for end in dag[beg])
+    words = []
+    beg = 0
+    while beg < size:
+        words.append(string[beg:best_end[beg]])
+        beg = best_end[beg]
+    return ' '.join(words)
+
+
 def load_dictionary(file_name):
     '''load dictionary from text file, one word per line, IFF DICTIONARY is empty'''
     word_count = 0
@@ -279,6 +454,159 @@ def two_word_palindromes(dictionary, verbose=1):
     return result
 
 
+class _PalNode:
+    '''trie node for PalindromeFinder'''
+    __slots__ = ('kids', 'word', 'pal_rest')
+
+    def __init__(self):
+        self.kids = {}
+        self.word = None        # word whose path ends here
+        self.pal_rest = ()      # words whose paths continue from here with a palindrome
+
+class PalindromeFinder:
+    '''
+    Finds multi-word palindromes made of dictionary words, such as "live evil" and
+    "shallot ayatollahs", by matching words from both ends at once: words added on the
+    left are matched against a trie of the reversed words, and words added on the right
+    against a trie of the words.  Whatever is left over on one side (the overhang) must
+    be covered by the next word on the other side, until it is itself a palindrome.
+    Each trie node lists the words whose paths go on from it with a palindrome,
+    so the last word of a phrase is found without scanning its subtree.
+
+    >>> words = ['live', 'evil', 'go', 'dog', 'race', 'car', 'civic', 'top', 'pot', 'step', 'on', 'no', 'pets']
+    >>> finder = PalindromeFinder(words)
+    >>> sorted(finder.palindromes(2))   # doctest: +NORMALIZE_WHITESPACE
+    ['civic civic', 'evil live', 'go dog', 'live evil', 'no on', 'on no', 'pets step',
+     'pot top', 'race car', 'step pets', 'top pot']
+    >>> [phrase for phrase in sorted(finder.palindromes(3)) if phrase.startswith('top')]
+    ['top civic pot', 'top pot']
+    >>> phrases = list(finder.palindromes(4))
+    >>> 'step on no pets' in phrases, len(phrases) == len(set(phrases))
+    (True, True)
+    >>> phrases_by_brute_force = {' '.join(phrase) for size in (2, 3, 4)
+    ...     for phrase in itertools.product(words, repeat=size) if is_palindrome(''.join(phrase))}
+    >>> set(phrases) == phrases_by_brute_force
+    True
+    '''
+    def __init__(self, words):
+        self.words = list(words)
+        self.rev_trie = self._build(self.words, True)
+        self._fwd_trie = None
+
+    @property
+    def fwd_trie(self):
+        '''trie of the words, built on first use (only palindromes of 3 or more words need it)'''
+        if self._fwd_trie is None:
+            self._fwd_trie = self._build(self.words, False)
+        return self._fwd_trie
+
+    @staticmethod
+    def _build(words, reverse):
+        '''trie of words (reversed if reverse), with pal_rest lists'''
+        gc_was_enabled = gc.isenabled()
+        gc.disable()            # tries are large and acyclic, so skip collecting while building one
+        try:
+            return PalindromeFinder._build_nodes(words, reverse)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    @staticmethod
+    def _build_nodes(words, reverse):
+        '''root node of the trie of words (reversed if reverse), with pal_rest lists'''
+        root = _PalNode()
+        for word in words:
+            path = word[::-1] if reverse else word
+            node = root
+            for idx, char in enumerate(path):
+                rest = path[idx:]
+                if rest == rest[::-1]:
+                    if node.pal_rest:
+                        node.pal_rest.append(word)
+                    else:
+                        node.pal_rest = [word]
+                kid = node.kids.get(char)
+                if kid is None:
+                    kid = node.kids[char] = _PalNode()
+                node = kid
+            node.word = word
+        return root
+
+    def _cover(self, trie, text, last, reverse):
+        '''
+        Generate (word, rest, same_side) for each word whose path in trie matches text
+        as far as either goes: if the path is a prefix of text, rest is the rest of text,
+        still on the same side; if text is a prefix of the path, rest is the rest of the
+        path, now on the other side.  If last, only generate words whose rest is a palindrome.
+        '''
+        node = trie
+        for idx, char in enumerate(text):
+            node = node.kids.get(char)
+            if node is None:
+                return
+            if node.word is not None and (not last or is_palindrome(text[idx + 1:])):
+                yield node.word, text[idx + 1:], True
+        size = len(text)
+        if last:
+            for word in node.pal_rest:
+                path = word[::-1] if reverse else word
+                yield word, path[size:], False
+            return
+        stack = list(node.kids.values())
+        while stack:
+            node = stack.pop()
+            stack.extend(node.kids.values())
+            if node.word is not None:
+                path = node.word[::-1] if reverse else node.word
+                yield node.word, path[size:], False
+
+    def _extend(self, left, right, text, on_left, max_words):
+        '''Generate palindromes extending left + reversed(right) with overhang text.'''
+        num_words = len(left) + len(right)
+        if num_words >= max_words:
+            return
+        last = num_words + 1 == max_words
+        if on_left:     # cover the left overhang with a word on the right
+            covers = self._cover(self.rev_trie, text, last, True)
+        else:           # cover the right overhang with a word on the left
+            covers = self._cover(self.fwd_trie, text, last, False)
+        for word, rest, same_side in covers:
+            if on_left:
+                right.append(word)
+            else:
+                left.append(word)
+            rest_on_left = on_left if same_side else not on_left
+            if is_palindrome(rest):
+                yield ' '.join(left + right[::-1])
+            if not last:
+                yield from self._extend(left, right, rest, rest_on_left, max_words)
+            if on_left:
+                right.pop()
+            else:
+                left.pop()
+
+    def palindromes(self, max_words=2, first_words=None):
+        '''
+        Generate every palindrome of 2 to max_words dictionary words (a word may repeat)
+        as a string of words separated by spaces, starting with each of first_words
+        (default: all the words).  The search is bounded by max_words, but the number
+        of results still grows quickly beyond 2 words; take as many as needed.
+        '''
+        for word in (self.words if first_words is None else first_words):
+            yield from self._extend([word], [], word, True, max_words)
+
+def two_word_palindromes_trie(dictionary, verbose=1):
+    ''' find all 2-word palindromes in the given dictionary, using PalindromeFinder.
+        e.g. "live evil", "go dog", "across orca", "shallot ayatollahs"
+    '''
+    result = []
+    for two_word_palindrome in PalindromeFinder(dictionary).palindromes(2):
+        if verbose > 0:
+            print(two_word_palindrome)
+        result.append(two_word_palindrome)
+    return result
+
+
 def test_string2words():
     '''test the string2words functions'''
     if len(sys.argv) > 1:
@@ -287,7 +615,7 @@ def test_string2words():
         file_name = "words.txt"
 
     if len(sys.argv) > 2:
-        strings = [sys.argv[2:]]
+        strings = sys.argv[2:]
     else:
         strings = ["minimumergold", "garbageatone", 'atone']
 
@@ -295,6 +623,10 @@ def test_string2words():
 
     load_dictionary(file_name)
 
+    if len(sys.argv) > 2:
+        test_parses(strings)
+        return
+
     print("\n\t  palindromes_with_one_or_more_anagrams(DICTIONARY):")
     palindromes_with_one_or_more_anagrams(DICTIONARY)
     print("\n\t  palindromes_with_palindromic_anagrams(DICTIONARY):")
@@ -312,22 +644,27 @@ def test_string2words():
     print("two_word_palindromes list len: ", len(twps))
     uniq = set(twps)
     print("two_word_palindromes  set len: ", len(uniq))
-    return
-
-    if len(sys.argv) > 3:
-        word = sys.argv[3]
-        print("is_word(", word, ") returned ", is_word(word), "\n")
 
+def unigram_model():
+    '''UnigramModel from the prebuilt word_freqs table if there is one, else uniform'''
+    try:
+        import word_freqs
+        table = word_freqs.WordFreqTable.load()
+        return UnigramModel(table.count, table.total, len(DICTIONARY))
+    except (ImportError, OSError):
+        return UnigramModel(vocab_size=len(DICTIONARY))
+
+def test_parses(strings, max_show=8):
+    '''print the best parse, number of parses, and first few parses of each string'''
+    model = unigram_model()
     for string in strings:
-        ret = string2words_from_end_one(string, "")
-        num_parses = 0
-        if ret != None:
-            num_parses = 1
-        print("string2words_from_end_one got", num_parses, "(" + ret + ")")
-        all_parses = []
-        string2words_from_beg_all(string, "", all_parses)
-        num_parses = len(all_parses)
-        print("string2words_from_beg_all got", str(num_parses), all_parses)
+        dag = parse_dag(string)
+        print("string2words_best got:", string2words_best(string, model, dag))
+        print("parse count:", count_parses(dag))
+        for parse in itertools.islice(all_parses(string, dag), max_show):
+            print("\t", parse)
+        if len(string) <= 2 * MAX_WORD_LEN:
+            print("string2words_from_end_one got:", string2words_from_end_one(string, ""))
 
 if __name__ == '__main__':
     test_string2words()
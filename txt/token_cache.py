@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+'''
+Memoized tokenizer results, keyed by a hash of the text: a bounded LRU dict in memory,
+optionally backed by an SQLite file so that repeat runs skip tokenizing altogether.
+'''
+
+import argparse
+import hashlib
+import json
+import sqlite3
+from lru_cache import LruCache
+
+class TokenCache:
+    '''LRU cache of text -> token list, with optional on-disk store and hit/miss counters.'''
+
+    def __init__(self, max_size=100000, path=None, name='tokens', flush_every=1000):
+        '''
+        max_size:       maximum number of texts kept in memory
+        path:           SQLite file to read from and write to, or None for memory only
+        name:           namespace for keys, so different tokenizers can share one file
+        flush_every:    number of new entries to collect before committing them to disk
+        '''
+        self.name = name
+        self.flush_every = flush_every
+        self._lru = LruCache(max_size)
+        self._pending = []
+        self._db = None
+        self.path = None
+        self.disk_hits = 0
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        '''Open (or create) the on-disk store at path, flushing and closing any previous one.'''
+        self.close()
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute('CREATE TABLE IF NOT EXISTS tokens (key BLOB PRIMARY KEY, toks TEXT)')
+        self.path = path
+
+    def reopen(self):
+        '''
+        Open a new connection to the same on-disk store without touching the current one,
+        as needed in a forked child process, which must not use its parent's connection.
+        '''
+        self._db = None
+        self._pending = []
+        if self.path:
+            self.open(self.path)
+
+    def close(self):
+        '''Write any pending entries and close the on-disk store, if any.'''
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def flush(self):
+        '''Commit pending new entries to the on-disk store.'''
+        if self._db is not None and self._pending:
+            self._db.executemany('INSERT OR REPLACE INTO tokens VALUES (?, ?)', self._pending)
+            self._db.commit()
+        self._pending = []
+
+    def key(self, text):
+        '''hash of the namespace and the text'''
+        return hashlib.blake2b((self.name + '\0' + text).encode('utf-8'), digest_size=16).digest()
+
+    def get(self, text, tokenize):
+        '''Returns the list of tokens for text, calling tokenize(text) only on a cache miss.'''
+        key = self.key(text)
+        toks = self._lru.lookup(key)
+        if toks is not None:
+            return list(toks)
+        if self._db is not None:
+            row = self._db.execute('SELECT toks FROM tokens WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                toks = tuple(json.loads(row[0]))
+                self.disk_hits += 1
+        if toks is None:
+            toks = tuple(tokenize(text))
+            if self._db is not None:
+                self._pending.append((key, json.dumps(toks)))
+                if len(self._pending) >= self.flush_every:
+                    self.flush()
+        self._lru.store(key, toks)
+        return list(toks)
+
+    def clear(self):
+        '''Empty the in-memory cache and reset the counters (the on-disk store is kept).'''
+        self._lru.clear()
+        self._lru.hits = self._lru.misses = self.disk_hits = 0
+
+    def stats(self):
+        '''
+        Returns dict of counters: hits in memory, disk_hits, misses (texts tokenized), size in
+        memory, and max_size.  The memory misses counted by the LRU are disk hits or misses.
+        '''
+        return {'hits': self._lru.hits, 'disk_hits': self.disk_hits,
+                'misses': self._lru.misses - self.disk_hits, 'size': len(self._lru),
+                'max_size': self._lru.max_size}
+
+    def print_stats(self):
+        '''Show counters since init or clear.'''
+        stats = self.stats()
+        total = stats['hits'] + stats['disk_hits'] + stats['misses']
+        print("TokenCache %s:  hits %d  disk_hits %d  misses %d  (hit rate %.3f)  size %d / %d"
+              % (self.name, stats['hits'], stats['disk_hits'], stats['misses'],
+                 (stats['hits'] + stats['disk_hits']) / total if total else 0.0, stats['size'],
+                 stats['max_size']))
+
+def smoke_test():
+    '''test LRU eviction and counters with a trivial tokenizer'''
+    cache = TokenCache(max_size=2)
+    for text in ['a b', 'c d', 'a b', 'e f', 'c d']:
+        print(text, '->', cache.get(text, str.split))
+    cache.print_stats()
+
+def main():
+    '''show stats of an on-disk token cache, or run the smoke test'''
+    parser = argparse.ArgumentParser(description="memoized tokenizer results")
+    parser.add_argument('cache_file', type=str, nargs='?', help='SQLite token cache file')
+    args = parser.parse_args()
+    if args.cache_file:
+        with sqlite3.connect(args.cache_file) as dbc:
+            print("%s: %d entries" % (args.cache_file,
+                                      dbc.execute('SELECT COUNT(*) FROM tokens').fetchone()[0]))
+    else:
+        smoke_test()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+'''
+Memory-mapped word2vec vectors: a one-time conversion of a binary word2vec model file
+(as read by gensim's load_word2vec_format) into
+    PREFIX.vectors.npy      float32 array, one row per word, in the model's order
+    PREFIX.words.bin        the words as UTF-8 bytes, concatenated in sorted order
+    PREFIX.offsets.npy      int64 offsets of each sorted word in words.bin, plus the end
+    PREFIX.rows.npy         int32 row in vectors.npy of each sorted word
+Opening these maps the files instead of reading them, so it takes milliseconds, and
+processes that open the same files share their pages read-only.
+
+Convert once with:  python word2vec_mmap.py GoogleNews-vectors-negative300.bin [PREFIX]
+'''
+import argparse
+import bisect
+import mmap
+import os.path
+import time
+import numpy as np
+
+def default_prefix(model_file):
+    '''default output prefix for a model file: its path without the extension'''
+    return os.path.splitext(model_file)[0]
+
+class _SortedWords:
+    '''Read-only sequence of the sorted words (as bytes) in a words.bin mmap, for bisect.'''
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.blob[int(self.offsets[idx]):int(self.offsets[idx + 1])]
+
+class Word2VecMmap:
+    '''
+    Read-only word -> vector mapping over the files written by convert_word2vec_model.
+    Supports the parts of the gensim KeyedVectors interface used in sim_gensim:
+    word2vec[word], word in word2vec, vector_size, vocab.keys(), and similarity.
+    '''
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.vectors = np.load(prefix + '.vectors.npy', mmap_mode='r')
+        self.offsets = np.load(prefix + '.offsets.npy', mmap_mode='r')
+        self.rows = np.load(prefix + '.rows.npy', mmap_mode='r')
+        with open(prefix + '.words.bin', 'rb') as words_file:
+            blob = mmap.mmap(words_file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(
+                words_file.fileno()).st_size else b''
+        self._words = _SortedWords(blob, self.offsets)
+        self.vector_size = self.vectors.shape[1]
+
+    def index(self, word):
+        '''row of word in self.vectors, or -1 if it is not in the vocabulary'''
+        key = word.encode('utf-8')
+        idx = bisect.bisect_left(self._words, key)
+        if idx < len(self._words) and self._words[idx] == key:
+            return int(self.rows[idx])
+        return -1
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __getitem__(self, word):
+        row = self.index(word)
+        if row < 0:
+            raise KeyError("word '%s' not in vocabulary" % word)
+        return self.vectors[row]
+
+    def __len__(self):
+        return len(self._words)
+
+    def keys(self):
+        '''iterate over all words, in sorted (byte) order'''
+        for idx in range(len(self._words)):
+            yield self._words[idx].decode('utf-8', errors='replace')
+
+    @property
+    def vocab(self):
+        '''for code written against old gensim's word2vec.vocab.keys()'''
+        return self
+
+    def similarity(self, word_1, word_2):
+        '''cosine similarity of two words' vectors, as in KeyedVectors.similarity'''
+        vec_1, vec_2 = self[word_1], self[word_2]
+        return float(np.dot(vec_1, vec_2) / (np.linalg.norm(vec_1) * np.linalg.norm(vec_2)))
+
+def read_word2vec_binary(model_file):
+    '''
+    Generate (word_bytes, vector) pairs from a binary word2vec model file, after first
+    yielding the (count, dimension) header as a pair.
+    '''
+    with open(model_file, 'rb') as model:
+        count, dim = (int(tok) for tok in model.readline().split())
+        yield count, dim
+        nbytes = np.dtype(np.float32).itemsize * dim
+        for _ in range(count):
+            chars = []
+            while True:
+                char = model.read(1)
+                if char == b' ' or not char:
+                    break
+                if char != b'\n':
+                    chars.append(char)
+            yield b''.join(chars), np.frombuffer(model.read(nbytes), dtype=np.float32)
+
+def convert_word2vec_model(model_file, prefix=None, verbose=True):
+    '''Convert a binary word2vec model file to the memory-mappable files read by Word2VecMmap.'''
+    prefix = prefix or default_prefix(model_file)
+    beg_time = time.time()
+    pairs = read_word2vec_binary(model_file)
+    count, dim = next(pairs)
+    vectors = np.lib.format.open_memmap(prefix + '.vectors.npy', mode='w+', dtype=np.float32,
+                                        shape=(count, dim))
+    words = []
+    for row, (word, vector) in enumerate(pairs):
+        vectors[row] = vector
+        words.append(word)
+    vectors.flush()
+    del vectors
+    order = sorted(range(len(words)), key=words.__getitem__)
+    offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    with open(prefix + '.words.bin', 'wb') as words_file:
+        for idx, row in enumerate(order):
+            words_file.write(words[row])
+            offsets[idx + 1] = offsets[idx] + len(words[row])
+    np.save(prefix + '.offsets.npy', offsets)
+    np.save(prefix + '.rows.npy', np.array(order, dtype=np.int32))
+    if verbose:
+        print("Converted %d words x %d dims from %s to %s.* in %.1f seconds"
+              % (len(words), dim, model_file, prefix, time.time() - beg_time))
+    return prefix
+
+def main():
+    '''convert a word2vec model file, then time opening the result'''
+    parser = argparse.ArgumentParser(description="convert binary word2vec model to memory-mappable files")
+    parser.add_argument('model_file', type=str, help='binary word2vec model file')
+    parser.add_argument('prefix', type=str, nargs='?', default=None,
+                        help='output path prefix (default: model_file without extension)')
+    args = parser.parse_args()
+    prefix = convert_word2vec_model(args.model_file, args.prefix)
+    beg_time = time.time()
+    word2vec = Word2VecMmap(prefix)
+    print("Opened %d word vectors in %.3f seconds" % (len(word2vec), time.time() - beg_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- encoding: <utf-8> -*-
+'''
+word_freqs.py - Prebuilt table of lowercased word counts from a corpus (Brown by default),
+saved as a sorted array of UTF-8 words and a parallel array of counts, and loaded
+memory-mapped, so looking up a count is a binary search with no startup counting.
+
+Rebuild from the NLTK Brown corpus:         python word_freqs.py
+or from any text files:                     python word_freqs.py -out my_freqs corpus1.txt corpus2.txt
+'''
+import argparse
+import os.path
+import re
+import time
+from collections import Counter
+import numpy as np
+
+WORD_FREQS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'brown_freqs')
+RE_WORD = re.compile(r"\S+")
+
+class WordFreqTable:
+    '''Counts of lowercase words, from sorted arrays of words and counts.'''
+
+    def __init__(self, words, counts):
+        '''words: sorted numpy bytes array of UTF-8 words; counts: their counts'''
+        self.words = words
+        self.counts = counts
+        self.total = int(counts.sum())
+
+    @classmethod
+    def from_counts(cls, word_counts):
+        '''Make a table from a dict or Counter mapping words to counts.'''
+        items = sorted((word.encode('utf-8'), count) for word, count in word_counts.items())
+        return cls(np.array([word for word, _ in items], dtype=bytes),
+                   np.array([count for _, count in items], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path=WORD_FREQS_PATH):
+        '''Load a table saved by save, memory-mapped.'''
+        return cls(np.load(path + '.words.npy', mmap_mode='r'), np.load(path + '.counts.npy', mmap_mode='r'))
+
+    def save(self, path=WORD_FREQS_PATH):
+        '''Save the table as path.words.npy and path.counts.npy'''
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.save(path + '.words.npy', np.asarray(self.words))
+        np.save(path + '.counts.npy', np.asarray(self.counts))
+
+    def count(self, word):
+        '''count of word (as is; callers lowercase it), or 0 if not found'''
+        key = word.encode('utf-8')
+        idx = int(np.searchsorted(self.words, key))
+        if idx < len(self.words) and self.words[idx] == key:
+            return int(self.counts[idx])
+        return 0
+
+    def __len__(self):
+        return len(self.words)
+
+def count_words(sents):
+    '''Counter of lowercased words from an iterable of sentences as lists of words'''
+    counts = Counter()
+    for sent in sents:
+        counts.update(word.lower() for word in sent)
+    return counts
+
+def brown_counts():
+    '''Counter of lowercased words in the NLTK Brown corpus'''
+    from nltk.corpus import brown
+    return count_words(brown.sents())
+
+def file_counts(paths, charset='utf8'):
+    '''Counter of lowercased whitespace-separated words in text files'''
+    counts = Counter()
+    for path in paths:
+        with open(path, 'r', encoding=charset) as text:
+            for line in text:
+                counts.update(word.lower() for word in RE_WORD.findall(line))
+    return counts
+
+def main():
+    '''build and save a word frequency table from the Brown corpus or from text files'''
+    parser = argparse.ArgumentParser(description="build a word frequency table")
+    parser.add_argument('text_files', type=str, nargs='*',
+                        help='text files to count words in (default: the NLTK Brown corpus)')
+    parser.add_argument('-charset', type=str, default='utf8', help='charset encoding of text files')
+    parser.add_argument('-out', type=str, default=WORD_FREQS_PATH,
+                        help='output path prefix (default: %(default)s)')
+    args = parser.parse_args()
+    beg_time = time.time()
+    counts = file_counts(args.text_files, args.charset) if args.text_files else brown_counts()
+    table = WordFreqTable.from_counts(counts)
+    table.save(args.out)
+    print("Saved %d words, %d tokens to %s in %.1f seconds" % (len(table), table.total, args.out,
+                                                                time.time() - beg_time))
+
+if __name__ == '__main__':
+    main()
@@ -15,10 +15,15 @@ so the article "the" gets nothing, but "a" can be tagged as a noun, etc.
 from __future__ import division
 import argparse
 import math
+import os.path
 import pdb
+import pickle
 import sys
 from collections import namedtuple
 from nltk.corpus import wordnet as wn
+import numpy as np
+from lru_cache import LruCache
+import wordnet_index
 import words_en
 
 class Warnt(namedtuple("Warnt", "tok pos wnt cap")):
@@ -44,15 +49,26 @@ def pos_wnk(tag):
 ######################### word similarity ##########################
 
 class WordNetSimilarity:
-    '''Word similarity using NLTK WordNet Synsets.'''
+    '''
+    Word similarity using NLTK WordNet Synsets.
+    Synsets are cached per (word, tag), and similarities per (src_word, src_tag, try_word, try_tag),
+    both in bounded LRU caches.  The similarity cache can be saved to and loaded from cache_path.
+    If wn_index (a wordnet_index.WordNetIndex) is given, path lengths and hypernym distances
+    of the synsets it covers are looked up there instead of being searched for in WordNet.
+    '''
 
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, max_synsets=50000, max_word_pairs=1000000, cache_path=None,
+                 wn_index=None):
         '''Initialize internals'''
         self.verbose = verbose
+        self.wn_index = wn_index
         self._synsets_fetches = 0
         self._synsets_fetched = 0
         self._max_path_length = 0
         self._max_depth_delta = 0
+        self._synsets_cache = LruCache(max_synsets)
+        self._word_sim_cache = LruCache(max_word_pairs)
+        self.cache_path = cache_path
 
         self._ignore_synsets_words = {'a', 'the', 'in', 'on', 'to'}
         self._alpha = 0.2
@@ -60,12 +76,69 @@ class WordNetSimilarity:
         self._sim_plural_proper_noun = 0.667   # TODO: rationalize this value?
         self._sim_possessive_proper_noun = 0.95   # TODO: rationalize this value?
         self._max_length_dist = 20.0    # TODO: find actual max
+        if cache_path and os.path.exists(cache_path):
+            self.load_cache(cache_path)
 
     def print_stats(self):
         '''Show statistics since init.'''
         print("Synsets fetched/fetches:  %d / %d  =  %.3f     max_length, max_depth:  %d  %d"
-              % (self._synsets_fetched, self._synsets_fetches, self._synsets_fetched / self._synsets_fetches,
+              % (self._synsets_fetched, self._synsets_fetches,
+                 self._synsets_fetched / self._synsets_fetches if self._synsets_fetches else 0.0,
                  self._max_path_length, self._max_depth_delta))
+        print("Synsets cache:          ", self._synsets_cache.stats_str())
+        print("Word similarity cache:  ", self._word_sim_cache.stats_str())
+
+    def _cache_params(self):
+        '''parameters that the cached similarities depend on'''
+        return (self._alpha, self._beta, self._max_length_dist, self.wn_index is not None)
+
+    def save_cache(self, path=None):
+        '''Save the word-pair similarity cache to path (default: self.cache_path) as a pickle file.'''
+        path = path or self.cache_path
+        with open(path, 'wb') as out_file:
+            pickle.dump((self._cache_params(), dict(self._word_sim_cache)), out_file)
+
+    def load_cache(self, path=None):
+        '''
+        Load word-pair similarities saved by save_cache, unless they were computed with other
+        parameters.  Returns the number of similarities loaded.
+        '''
+        path = path or self.cache_path
+        with open(path, 'rb') as in_file:
+            params, word_sims = pickle.load(in_file)
+        if params != self._cache_params():
+            print("WordNetSimilarity.load_cache: ignoring %s, saved with other parameters %s" % (path, params))
+            return 0
+        for key, sim in word_sims.items():
+            self._word_sim_cache.store(key, sim)
+        return len(word_sims)
+
+    def synsets(self, word, tag=None):
+        '''WordNet synsets for word with optional POS tag, as in wn.synsets, but cached.'''
+        key = (word, tag)
+        synsets = self._synsets_cache.lookup(key)
+        if synsets is None:
+            synsets = self._synsets_cache.store(key, wn.synsets(word, tag))
+            self._synsets_fetches += 1
+            self._synsets_fetched += len(synsets)
+        return synsets
+
+    def _index_ids(self, synset_1, synset_2):
+        '''IDs of both synsets in self.wn_index, or None if either is not indexed'''
+        if self.wn_index is None:
+            return None
+        sid_1 = self.wn_index.synset_id(synset_1)
+        sid_2 = self.wn_index.synset_id(synset_2)
+        if sid_1 is None or sid_2 is None:
+            return None
+        return sid_1, sid_2
+
+    def wn_path_similarity(self, synset_1, synset_2):
+        '''wn.path_similarity, from self.wn_index if possible'''
+        sids = self._index_ids(synset_1, synset_2)
+        if sids is None:
+            return wn.path_similarity(synset_1, synset_2)
+        return self.wn_index.path_similarity(*sids)
 
     def find_max_path_sim_synset_pair(self, src_word, try_word, src_tag=None, try_tag=None):
         """
@@ -74,22 +147,16 @@ class WordNetSimilarity:
         """
         max_sim = -1.0
 
-        synsets_1 = wn.synsets(src_word, src_tag)
-        self._synsets_fetches += 1
+        synsets_1 = self.synsets(src_word, src_tag)
         if not synsets_1:
             # print("synset(%s) is None" % src_word)
             return None, None
 
-        self._synsets_fetched += len(synsets_1)
-
-        self._synsets_fetches += 1
-        synsets_2 = wn.synsets(try_word, try_tag)
+        synsets_2 = self.synsets(try_word, try_tag)
         if not synsets_2:
             # print("synset(%s) is None" % try_word)
             return None, None
 
-        self._synsets_fetched += len(synsets_2)
-
         fixme_count = 0
 
         max_sim = -1.0
@@ -97,7 +164,7 @@ class WordNetSimilarity:
         for synset_1 in synsets_1:
             for synset_2 in synsets_2:
                 if synset_1._pos != 's' and synset_1._pos == synset_2._pos:
-                    sim = wn.path_similarity(synset_1, synset_2)
+                    sim = self.wn_path_similarity(synset_1, synset_2)
                     if sim is None:
                         if fixme_count == 0:
                             # FIXME: when does this short-circut happen?
@@ -134,7 +201,11 @@ class WordNetSimilarity:
             else:
                 # just compute the shortest path between the two
                 # pdb.set_trace()
-                l_dist = synset_1.shortest_path_distance(synset_2)
+                sids = self._index_ids(synset_1, synset_2)
+                if sids is None:
+                    l_dist = synset_1.shortest_path_distance(synset_2)
+                else:
+                    l_dist = self.wn_index.shortest_path_distance(*sids)
                 if self.verbose > 2:
                     print("l_dist({}, {}) = {}\n".format(synset_1, synset_2, l_dist))
                 if l_dist is None:
@@ -153,13 +224,20 @@ class WordNetSimilarity:
         h_dist = sys.maxsize
         if synset_1 is None or synset_2 is None:
             return h_dist
-        if synset_1 == synset_2:
+        sids = self._index_ids(synset_1, synset_2)
+        if sids is not None:
+            if synset_1 == synset_2:
+                h_dist = self.wn_index.max_depth(sids[0])
+            else:
+                h_dist = self.wn_index.lcs_distance(*sids)
+        elif synset_1 == synset_2:
             # return the depth of one of synset_1 or synset_2
             h_dist = max([x[1] for x in synset_1.hypernym_distances()])
         else:
-            # find the max depth of least common subsumer
-            hypernyms_1 = {x[0]:x[1] for x in synset_1.hypernym_distances()}
-            hypernyms_2 = {x[0]:x[1] for x in synset_2.hypernym_distances()}
+            # find the max depth of least common subsumer, by the shortest distance
+            # to each hypernym, as in wn_index.lcs_distance
+            hypernyms_1 = wordnet_index.hypernym_ancestors(synset_1)
+            hypernyms_2 = wordnet_index.hypernym_ancestors(synset_2)
             lcs_candidates = set(hypernyms_1.keys()).intersection(
                 set(hypernyms_2.keys()))
             if lcs_candidates:
@@ -193,11 +271,17 @@ class WordNetSimilarity:
         word is more important and less variable.  It's the known or fixed word,
         whereas the try_word is variable, one of many in a search set of, say, possible
         synonyms.  Maybe it's from an intersection, rather than a union.
+        Results are cached per (src_word, src_tag, try_word, try_tag).
         '''
+        key = (src_word, src_tag, try_word, try_tag)
+        sim = self._word_sim_cache.lookup(key)
+        if sim is not None:
+            return sim
         pair = self.find_max_path_sim_synset_pair(src_word, try_word, src_tag, try_tag)
         if self.verbose > 3:
             print("word_similarity best_pair({}, {}) => ({}, {})".format(src_word, try_word, pair[0], pair[1]))
-        return self.path_similarity(pair[0], pair[1]) * self.depth_similarity(pair[0], pair[1])
+        sim = self.path_similarity(pair[0], pair[1]) * self.depth_similarity(pair[0], pair[1])
+        return self._word_sim_cache.store(key, sim)
 
 
     def most_similar_word(self, sent_word_set, src_word):
@@ -225,36 +309,63 @@ class WordNetSimilarity:
         word and the actual similarity value.
         """
         # print("%d  %3s  %s  %s" % (len(union_wpos), union_wpos, union_wtag, union_word))
-        union_wpos = union_ntags.pos
-        union_wtag = union_ntags.wnt
         max_sim = 0.0
         sim_word = ""
-        if union_wtag is not None and union_word not in self._ignore_synsets_words:
-            for item in sent_word_dct.items():
-                sent_wtag = item[1].wnt
-                if sent_wtag == union_wtag:
-                # or sent_wtag == 'a' and union_wtag == 'r'
-                # or sent_wtag == 'r' and union_wtag == 'a':
-                    sent_wpos = item[1].pos
-                    sent_word = item[0]
-                    if use_propers and sent_wpos == 'NNP' and union_wpos == 'NNP':
-                        # sent_word is likely to be a proper noun.  If we only
-                        # allow exact matches on proper nouns, then here we should
-                        # just continue, because we checked for equality upstream.
-                        if words_en.is_one_noun_possessive(union_word, sent_word):
-                            sim = self._sim_possessive_proper_noun
-                        elif words_en.is_one_noun_plural(union_word, sent_word):
-                            pdb.set_trace()
-                            sim = self._sim_plural_proper_noun
-                        else:
-                            sim = 0.0
-                    else:
-                        sim = self.word_similarity(union_word, sent_word, union_wtag, sent_wtag)
-                    if sim > max_sim:
-                        max_sim = sim
-                        sim_word = sent_word
+        for sent_word, sent_ntags in sent_word_dct.items():
+            sim = self.word_similarity_pos(union_word, union_ntags, sent_word, sent_ntags, use_propers)
+            if sim > max_sim:
+                max_sim = sim
+                sim_word = sent_word
         return sim_word, max_sim
 
+    def word_similarity_pos(self, union_word, union_ntags, sent_word, sent_ntags, use_propers=True):
+        '''
+        Similarity of union_word to sent_word as compared in most_similar_word_pos:
+        0.0 unless their WordNet tags match, special values for related proper nouns,
+        and word_similarity otherwise.
+        '''
+        union_wpos = union_ntags.pos
+        union_wtag = union_ntags.wnt
+        if union_wtag is None or union_word in self._ignore_synsets_words:
+            return 0.0
+        sent_wtag = sent_ntags.wnt
+        if sent_wtag != union_wtag:
+        # or sent_wtag == 'a' and union_wtag == 'r'
+        # or sent_wtag == 'r' and union_wtag == 'a':
+            return 0.0
+        sent_wpos = sent_ntags.pos
+        if use_propers and sent_wpos == 'NNP' and union_wpos == 'NNP':
+            # sent_word is likely to be a proper noun.  If we only
+            # allow exact matches on proper nouns, then here we should
+            # just continue, because we checked for equality upstream.
+            if words_en.is_one_noun_possessive(union_word, sent_word):
+                return self._sim_possessive_proper_noun
+            elif words_en.is_one_noun_plural(union_word, sent_word):
+                return self._sim_plural_proper_noun
+            return 0.0
+        return self.word_similarity(union_word, sent_word, union_wtag, sent_wtag)
+
+    def word_similarity_matrix(self, src_words, try_words):
+        '''
+        Array of word_similarity(src_word, try_word), one row per src_word and one column per
+        try_word.  Each pair is computed only once, in the word similarity cache.
+        '''
+        sims = np.zeros((len(src_words), len(try_words)))
+        for row, src_word in enumerate(src_words):
+            sims[row] = [self.word_similarity(src_word, try_word) for try_word in try_words]
+        return sims
+
+    def word_similarity_matrix_pos(self, union_words, union_ntags, sent_word_dct, use_propers=True):
+        '''
+        Array of word_similarity_pos, one row per union word (with NTags in union_ntags),
+        one column per word in sent_word_dct (mapping words to NTags), in its key order.
+        '''
+        sims = np.zeros((len(union_words), len(sent_word_dct)))
+        for row, (union_word, ntags) in enumerate(zip(union_words, union_ntags)):
+            sims[row] = [self.word_similarity_pos(union_word, ntags, sent_word, sent_ntags, use_propers)
+                         for sent_word, sent_ntags in sent_word_dct.items()]
+        return sims
+
 #################################### tests  ####################################
 
 # Yuhua Li, David McLean, Zuhair Bandar, et al
@@ -495,11 +606,13 @@ def test_word_similarity(wordsim, word_pairs=WORD_PAIRS_ME):
           % (total, len(word_pairs), avg_sim, min_sim, max_sim))
     return avg_sim
 
-def smoke_test(verbose):
+def smoke_test(verbose, cache_path=None, wn_index=None):
     '''test very basic functionality'''
-    wordsim = WordNetSimilarity(verbose)
+    wordsim = WordNetSimilarity(verbose, cache_path=cache_path, wn_index=wn_index)
     avg_sim = test_word_similarity(wordsim)
     test_word_list(wordsim)
+    if cache_path:
+        wordsim.save_cache()
     return avg_sim
 
 ###############################################################################
@@ -508,6 +621,8 @@ def main():
     parser = argparse.ArgumentParser(description="test lexical similarity of words")
     parser.add_argument('input_file', type=str, nargs='?', default='train_1000.label',
                         help='file containing text to filter')
+    parser.add_argument('-cache_file', type=str, default=None,
+                        help='load and save word similarities in this pickle file')
     parser.add_argument('-charset', dest='charset', type=str, default='iso-8859-1',
                         help='charset encoding of input text')
     parser.add_argument('-dir', dest='text_dir', type=str, default='/Users/sprax/text',
@@ -516,6 +631,8 @@ def main():
                         help='extract all lowercase words from a file')
     parser.add_argument('-output_file', type=str, nargs='?', default='lab.txt',
                         help='output path for filtered text (default: - <stdout>)')
+    parser.add_argument('-wn_index', type=str, nargs='?', const=wordnet_index.INDEX_DIR, default=None,
+                        help='use the precomputed WordNet index in this directory (see wordnet_index.py)')
     parser.add_argument('-verbose', type=int, nargs='?', const=1, default=1,
                         help='verbosity of output (default: 1)')
     parser.add_argument('-words_only', '-wrdo', action='store_true',
@@ -523,7 +640,8 @@ def main():
     parser.add_argument('-words_or_names', '-won', action='store_true',
                         help='extract only dictionary words or proper names')
     args = parser.parse_args()
-    smoke_test(args.verbose)
+    wn_index = wordnet_index.WordNetIndex(args.wn_index) if args.wn_index else None
+    smoke_test(args.verbose, args.cache_file, wn_index)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- encoding: <utf-8> -*-
+'''
+wordnet_index.py - Precomputed hypernym distances for all WordNet noun and verb synsets.
+Each synset gets an integer ID, and for each ID the index stores its ancestors (including
+itself) with their shortest hypernym distances, the longest hypernym path to a root
+(max_depth), and the height used for NLTK's simulated root.  The arrays are saved as .npy
+files in one directory and loaded memory-mapped, so path lengths and least-common-subsumer
+distances come from a few array slices instead of graph searches in NLTK's corpus reader.
+
+Build once with:    python wordnet_index.py -build [index_dir]
+'''
+import argparse
+import math
+import os.path
+import sys
+import time
+from collections import deque
+import numpy as np
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'wordnet_index')
+INDEX_POS = 'nv'
+CHECK_PAIRS = [('dog.n.01', 'cat.n.01'), ('person.n.01', 'dog.n.01'), ('coffee.n.01', 'water.n.01'),
+               ('person.n.01', 'person.n.01'), ('run.v.01', 'walk.v.01')]     # several hypernym paths
+
+class WordNetIndex:
+    '''Memory-mapped hypernym distances for WordNet synsets, keyed by synset name.'''
+
+    def __init__(self, index_dir=INDEX_DIR):
+        '''Load the index saved by build_index in index_dir.'''
+        with open(os.path.join(index_dir, 'names.txt'), 'r', encoding='utf-8') as names:
+            self.names = names.read().split('\n')
+        self.ids = {name: sid for sid, name in enumerate(self.names)}
+        self.pos = np.load(os.path.join(index_dir, 'pos.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(index_dir, 'offsets.npy'), mmap_mode='r')
+        self.anc_ids = np.load(os.path.join(index_dir, 'anc_ids.npy'), mmap_mode='r')
+        self.anc_dists = np.load(os.path.join(index_dir, 'anc_dists.npy'), mmap_mode='r')
+        self.max_depths = np.load(os.path.join(index_dir, 'max_depths.npy'), mmap_mode='r')
+        self.heights = np.load(os.path.join(index_dir, 'heights.npy'), mmap_mode='r')
+
+    def synset_id(self, synset):
+        '''integer ID of an NLTK synset, or None if it is not indexed'''
+        return self.ids.get(synset.name())
+
+    def ancestors(self, sid):
+        '''dict mapping the IDs of sid and all its hypernyms to their shortest distances from sid'''
+        beg, end = self.offsets[sid], self.offsets[sid + 1]
+        return dict(zip(self.anc_ids[beg:end].tolist(), self.anc_dists[beg:end].tolist()))
+
+    def max_depth(self, sid):
+        '''length of the longest hypernym path from sid to a root, as in Synset.max_depth'''
+        return int(self.max_depths[sid])
+
+    def shortest_path_distance(self, sid_1, sid_2, simulate_root=False):
+        '''
+        Shortest path length between two synsets through a common hypernym, as in
+        Synset.shortest_path_distance, or None if they have none.
+        '''
+        if sid_1 == sid_2:
+            return 0
+        ancs_2 = self.ancestors(sid_2)
+        dist = min((dist_1 + ancs_2[anc] for anc, dist_1 in self.ancestors(sid_1).items() if anc in ancs_2),
+                   default=math.inf)
+        if simulate_root:
+            dist = min(dist, int(self.heights[sid_1]) + int(self.heights[sid_2]) + 2)
+        return None if math.isinf(dist) else dist
+
+    def path_similarity(self, sid_1, sid_2):
+        '''1 / (shortest path length + 1), as in wn.path_similarity, which simulates a root for verbs'''
+        simulate_root = self.pos[sid_1] != ord('n') or self.pos[sid_2] != ord('n')
+        dist = self.shortest_path_distance(sid_1, sid_2, simulate_root)
+        return None if dist is None else 1.0 / (dist + 1)
+
+    def lcs_distance(self, sid_1, sid_2):
+        '''
+        Largest distance from either synset to any of their common hypernyms (0 if none),
+        which is the h_dist of WordNetSimilarity.depth_similarity for distinct synsets.
+        '''
+        ancs_2 = self.ancestors(sid_2)
+        return max((max(dist_1, ancs_2[anc]) for anc, dist_1 in self.ancestors(sid_1).items()
+                    if anc in ancs_2), default=0)
+
+def hypernym_ancestors(synset):
+    '''dict mapping synset and its hypernyms (including instance hypernyms) to shortest distances'''
+    dists = {}
+    queue = deque([(synset, 0)])
+    while queue:
+        syn, dist = queue.popleft()
+        if syn in dists:
+            continue
+        dists[syn] = dist
+        queue.extend((hyp, dist + 1) for hyp in syn.hypernyms() + syn.instance_hypernyms())
+    return dists
+
+def nltk_lcs_distance(synset_1, synset_2):
+    '''
+    WordNetIndex.lcs_distance computed from NLTK's hypernym_distances, which holds a distance
+    for each path to a hypernym, so the shortest distance to each one is kept.
+    '''
+    ancs_1, ancs_2 = {}, {}
+    for ancs, synset in ((ancs_1, synset_1), (ancs_2, synset_2)):
+        for anc, dist in synset.hypernym_distances():
+            ancs[anc] = min(dist, ancs.get(anc, dist))
+    return max((max(dist_1, ancs_2[anc]) for anc, dist_1 in ancs_1.items() if anc in ancs_2), default=0)
+
+def check_index(index, pairs=CHECK_PAIRS):
+    '''
+    Print max_depth, path_similarity and lcs_distance from index and from NLTK for pairs of
+    synset names, and return the number of pairs on which they differ.
+    '''
+    from nltk.corpus import wordnet as wn
+    mismatches = 0
+    for name_1, name_2 in pairs:
+        if name_1 not in index.ids or name_2 not in index.ids:
+            continue
+        sid_1, sid_2 = index.ids[name_1], index.ids[name_2]
+        syn_1, syn_2 = wn.synset(name_1), wn.synset(name_2)
+        indexed = (index.max_depth(sid_1), index.max_depth(sid_2), index.path_similarity(sid_1, sid_2),
+                   index.lcs_distance(sid_1, sid_2))
+        nltk = (syn_1.max_depth(), syn_2.max_depth(), wn.path_similarity(syn_1, syn_2),
+                nltk_lcs_distance(syn_1, syn_2))
+        mismatches += indexed != nltk
+        print("%s %s  max_depths %d %d  path_similarity %s  lcs_distance %d  %s" % (
+            name_1, name_2, indexed[0], indexed[1], indexed[2], indexed[3],
+            'matches NLTK' if indexed == nltk else 'differs from NLTK: %s' % (nltk,)))
+    return mismatches
+
+def build_index(index_dir=INDEX_DIR, pos_list=INDEX_POS, verbose=True):
+    '''Compute hypernym distances for all synsets of the parts of speech in pos_list and save them.'''
+    from nltk.corpus import wordnet as wn
+    beg_time = time.time()
+    synsets = [syn for pos in pos_list for syn in wn.all_synsets(pos)]
+    ids = {syn: sid for sid, syn in enumerate(synsets)}
+    offsets, anc_ids, anc_dists, heights = [0], [], [], []
+    for syn in synsets:
+        dists = sorted((ids[anc], dist) for anc, dist in hypernym_ancestors(syn).items())
+        anc_ids.extend(anc for anc, _ in dists)
+        anc_dists.extend(dist for _, dist in dists)
+        offsets.append(len(anc_ids))
+        heights.append(max(dist for _, dist in dists))
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, 'names.txt'), 'w', encoding='utf-8') as names:
+        names.write('\n'.join(syn.name() for syn in synsets))
+    np.save(os.path.join(index_dir, 'pos.npy'), np.array([ord(syn.pos()) for syn in synsets], dtype=np.uint8))
+    np.save(os.path.join(index_dir, 'offsets.npy'), np.array(offsets, dtype=np.int64))
+    np.save(os.path.join(index_dir, 'anc_ids.npy'), np.array(anc_ids, dtype=np.int32))
+    np.save(os.path.join(index_dir, 'anc_dists.npy'), np.array(anc_dists, dtype=np.int16))
+    np.save(os.path.join(index_dir, 'max_depths.npy'),
+            np.array([syn.max_depth() for syn in synsets], dtype=np.int16))
+    np.save(os.path.join(index_dir, 'heights.npy'), np.array(heights, dtype=np.int16))
+    if verbose:
+        print("build_index: %d synsets, %d ancestor entries saved to %s in %.1f seconds"
+              % (len(synsets), len(anc_ids), index_dir, time.time() - beg_time))
+
+def main():
+    '''build the WordNet index, or test lookups in one already built'''
+    parser = argparse.ArgumentParser(description="precomputed WordNet hypernym distances")
+    parser.add_argument('index_dir', type=str, nargs='?', default=INDEX_DIR,
+                        help='directory of the index files (default: %(default)s)')
+    parser.add_argument('-build', action='store_true', help='build and save the index')
+    parser.add_argument('-pos', type=str, default=INDEX_POS,
+                        help='parts of speech to index (default: %(default)s)')
+    args = parser.parse_args()
+    if args.build:
+        build_index(args.index_dir, args.pos)
+    beg_time = time.time()
+    index = WordNetIndex(args.index_dir)
+    print("Loaded %d synsets in %.3f seconds" % (len(index.names), time.time() - beg_time))
+    if check_index(index):
+        sys.exit("wordnet_index: index differs from NLTK")
+
+if __name__ == '__main__':
+    main()